@@ -39,4 +39,8 @@ class QuestionsGenerationException(Exception):
         
 class RubricsGenerationException(Exception):
     def __init__(self, message):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class OutputParsingException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
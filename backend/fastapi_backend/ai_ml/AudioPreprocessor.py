@@ -1,28 +1,79 @@
+import io
 import os
 import subprocess
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
 
 import numpy as np
 import soundfile as sf
 import webrtcvad
+from scipy.signal import resample_poly
 from ai_ml.AIExceptions import *
+from ai_ml.TranscriptionCache import pcm_digest
+
+
+# frame size used to find the quietest point around a chunk boundary
+_SNAP_FRAME_MS = 20
+
+# uncompressed / lossless containers libsndfile reads without ffmpeg
+_DIRECT_READ_FORMATS = {"WAV", "WAVEX", "W64", "RF64", "AIFF", "FLAC"}
+
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Grow every True run in a 1-D bool mask by `radius` on each side."""
+    if radius <= 0 or mask.size == 0:
+        return mask
+    # "full" and slice: mode="same" returns len(kernel) samples when the mask is shorter
+    counts = np.convolve(mask.astype(np.int32), np.ones(2 * radius + 1, dtype=np.int32), mode="full")
+    return counts[radius:radius + mask.size] > 0
 
 
 @dataclass
 class AudioMetadata:
     original_path: str
-    processed_path: str
+    processed_path: Optional[str]
     sample_rate: int
     duration_sec: float
 
 
+@dataclass
+class AudioChunk:
+    audio: np.ndarray
+    start_sec: float
+    end_sec: float
+    # seconds at the start of this chunk that repeat the end of the previous one
+    overlap_sec: float = 0.0
+
+
 @dataclass
 class PreprocessResult:
     audio: np.ndarray
     sample_rate: int
     metadata: AudioMetadata
-    chunks: List[np.ndarray]
+    chunks: List[AudioChunk]
+    # wall-clock seconds per stage: decode, vad, chunk
+    timings: Dict[str, float] = field(default_factory=dict)
+    # content hash of `audio`, set when config.compute_digest is on
+    digest: Optional[str] = None
+
+    def __getstate__(self):
+        # chunks are views into audio; send spans across processes, not copies
+        state = self.__dict__.copy()
+        sr = self.sample_rate
+        state["chunks"] = [
+            (round(c.start_sec * sr), round(c.end_sec * sr), c.overlap_sec) for c in self.chunks
+        ]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        sr = self.sample_rate
+        self.chunks = [
+            AudioChunk(self.audio[start:end], start / sr, end / sr, overlap)
+            for start, end, overlap in state["chunks"]
+        ]
 
 
 class AudioPreprocessorConfig:
@@ -32,13 +83,56 @@ class AudioPreprocessorConfig:
         target_channels: int = 1,
         vad_enabled: bool = True,
         vad_mode: int = 2,
+        vad_frame_ms: int = 30,
+        vad_padding_ms: int = 90,
+        vad_min_gap_ms: int = 150,
+        vad_energy_floor_db: float = -65.0,
+        denoise_enabled: bool = False,
+        denoise_stationary: bool = True,
+        denoise_prop_decrease: float = 0.9,
+        denoise_chunk_sec: float = 30.0,
+        denoise_padding_sec: float = 0.5,
         chunk_duration_sec: float = 90.0,
+        chunk_overlap_sec: float = 0.0,
+        chunk_search_window_sec: float = 2.0,
+        in_memory_decode: bool = True,
+        direct_read: bool = True,
+        compute_digest: bool = False,
     ):
         self.target_sample_rate = target_sample_rate
         self.target_channels = target_channels
         self.vad_enabled = vad_enabled
         self.vad_mode = vad_mode
+        # WebRTC VAD only accepts 10, 20 or 30 ms frames
+        self.vad_frame_ms = vad_frame_ms
+        # speech kept on each side of a voiced run (hangover)
+        self.vad_padding_ms = vad_padding_ms
+        # silences shorter than this between voiced frames are kept
+        self.vad_min_gap_ms = vad_min_gap_ms
+        # frames quieter than this (dBFS) skip the VAD call entirely
+        self.vad_energy_floor_db = vad_energy_floor_db
+        # spectral gating before VAD; noisy clips otherwise push whisper into
+        # temperature fallback, i.e. repeated decodes
+        self.denoise_enabled = denoise_enabled
+        # True = one noise profile per block (fan / hum), False = adaptive
+        self.denoise_stationary = denoise_stationary
+        self.denoise_prop_decrease = denoise_prop_decrease
+        # audio is denoised in blocks of this length so memory stays bounded
+        self.denoise_chunk_sec = denoise_chunk_sec
+        # extra context read on each side of a block, dropped afterwards
+        self.denoise_padding_sec = denoise_padding_sec
         self.chunk_duration_sec = chunk_duration_sec
+        # audio repeated at the start of each chunk from the end of the previous one
+        self.chunk_overlap_sec = chunk_overlap_sec
+        # each cut moves back to the quietest frame within this window; 0 = fixed cuts
+        self.chunk_search_window_sec = chunk_search_window_sec
+        # False restores the legacy mode that writes "<name>_16k.wav" to disk
+        self.in_memory_decode = in_memory_decode
+        # WAV/FLAC/AIFF are read with soundfile (and resampled in-process when
+        # needed) instead of spawning ffmpeg; other formats still go to ffmpeg
+        self.direct_read = direct_read
+        # hash the processed samples (for the transcription cache) where they are produced
+        self.compute_digest = compute_digest
 
 
 class AudioPreprocessor:
@@ -54,17 +148,78 @@ class AudioPreprocessor:
         if not os.path.isfile(input_path):
             raise AudioProcessingError(f"File not found: {input_path}")
 
-        wav_path = self._convert_to_pcm_wav(input_path, output_wav_path)
-        audio, sr = self._load_audio(wav_path)
+        start = time.perf_counter()
+        if self.config.in_memory_decode and output_wav_path is None:
+            wav_path = None
+            decoded = self._read_direct(input_path)
+            audio, sr = decoded or self._decode_to_array(input_path=input_path)
+        else:
+            wav_path = self._convert_to_pcm_wav(input_path, output_wav_path)
+            audio, sr = self._load_audio(wav_path)
+        decode_sec = time.perf_counter() - start
+
+        return self._finalize(audio, sr, os.path.abspath(input_path), wav_path, decode_sec)
+
+    def preprocess_bytes(self, data: bytes, source_name: str = "<bytes>") -> PreprocessResult:
+        """
+        Same as preprocess_file, but the encoded audio is fed to ffmpeg
+        through stdin so nothing touches the disk.
+        """
+        if not data:
+            raise AudioProcessingError("Empty audio payload")
+
+        start = time.perf_counter()
+        decoded = self._read_direct(io.BytesIO(data))
+        audio, sr = decoded or self._decode_to_array(input_bytes=data)
+        return self._finalize(audio, sr, source_name, None, time.perf_counter() - start)
+
+    def preprocess_array(self, audio: np.ndarray, source_name: str = "<array>") -> PreprocessResult:
+        """
+        Run VAD and chunking on samples that are already mono float32 at
+        config.target_sample_rate.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        return self._finalize(audio, self.config.target_sample_rate, source_name, None)
+
+    def _finalize(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        original_path: str,
+        wav_path: Optional[str],
+        decode_sec: float = 0.0,
+    ) -> PreprocessResult:
+        timings = {"decode": decode_sec}
 
+        if self.config.denoise_enabled:
+            start = time.perf_counter()
+            audio = self._denoise(audio, sr)
+            timings["denoise"] = time.perf_counter() - start
+
+        start = time.perf_counter()
         if self.config.vad_enabled:
             audio = self._trim_silence_vad(audio, sr)
+        timings["vad"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunks = self._chunk_audio(
+            audio,
+            sr,
+            self.config.chunk_duration_sec,
+            self.config.chunk_overlap_sec,
+            self.config.chunk_search_window_sec,
+        )
+        timings["chunk"] = time.perf_counter() - start
 
-        chunks = self._chunk_audio(audio, sr, self.config.chunk_duration_sec)
+        digest = None
+        if self.config.compute_digest:
+            start = time.perf_counter()
+            digest = pcm_digest(audio)
+            timings["digest"] = time.perf_counter() - start
 
         metadata = AudioMetadata(
-            original_path=os.path.abspath(input_path),
-            processed_path=os.path.abspath(wav_path),
+            original_path=original_path,
+            processed_path=os.path.abspath(wav_path) if wav_path else None,
             sample_rate=sr,
             duration_sec=len(audio) / sr,
         )
@@ -74,6 +229,8 @@ class AudioPreprocessor:
             sample_rate=sr,
             metadata=metadata,
             chunks=chunks,
+            timings=timings,
+            digest=digest,
         )
 
     def _convert_to_pcm_wav(self, input_path: str, output_path: Optional[str]) -> str:
@@ -101,6 +258,93 @@ class AudioPreprocessor:
 
         return output_path
 
+    def _read_direct(self, source) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Fast path for WAV/FLAC/AIFF: probe the header with soundfile and
+        read the samples in-process. 16-bit PCM that already matches the
+        target rate is scaled exactly like the ffmpeg path; anything else
+        is downmixed and brought to the target rate with a polyphase
+        resampler. Returns None when ffmpeg has to decode the input.
+        """
+        if not self.config.direct_read:
+            return None
+
+        try:
+            info = sf.info(source)
+        except Exception:
+            return None
+        if info.format not in _DIRECT_READ_FORMATS or info.frames <= 0:
+            return None
+
+        target_sr = self.config.target_sample_rate
+        as_int16 = info.subtype == "PCM_16" and info.samplerate == target_sr
+
+        try:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            data, sr = sf.read(source, dtype="int16" if as_int16 else "float32", always_2d=True)
+        except Exception:
+            return None
+
+        if data.shape[1] > 1:
+            audio = data.mean(axis=1, dtype=np.float32)
+        else:
+            audio = data[:, 0].astype(np.float32)
+        if as_int16:
+            audio /= 32768.0
+
+        if sr != target_sr:
+            g = np.gcd(sr, target_sr)
+            audio = resample_poly(audio, target_sr // g, sr // g).astype(np.float32, copy=False)
+
+        return audio, target_sr
+
+    def _decode_to_array(
+        self,
+        input_path: Optional[str] = None,
+        input_bytes: Optional[bytes] = None,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Decode with ffmpeg straight to raw s16le on stdout and wrap the
+        bytes in a NumPy buffer. Input comes from a path or from stdin.
+        """
+        source = input_path if input_bytes is None else "pipe:0"
+        channels = self.config.target_channels
+        sr = self.config.target_sample_rate
+
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-i", source,
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ac", str(channels),
+            "-ar", str(sr),
+            "pipe:1",
+        ]
+
+        try:
+            result = subprocess.run(
+                cmd,
+                input=input_bytes,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            raise AudioProcessingError("ffmpeg not found") from e
+
+        if result.returncode != 0:
+            raise AudioProcessingError(result.stderr.decode("utf-8", errors="replace"))
+
+        pcm = np.frombuffer(result.stdout, dtype=np.int16)
+        if channels > 1:
+            pcm = pcm[: len(pcm) - len(pcm) % channels].reshape(-1, channels)
+            audio = pcm.mean(axis=1, dtype=np.float32) / 32768.0
+        else:
+            audio = pcm.astype(np.float32) / 32768.0
+
+        return audio, sr
+
     def _load_audio(self, wav_path: str) -> Tuple[np.ndarray, int]:
         try:
             audio, sr = sf.read(wav_path, dtype="float32")
@@ -112,38 +356,281 @@ class AudioPreprocessor:
 
         return audio, sr
 
+    def _denoise(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Spectral gating (noisereduce) over fixed-size blocks of the float32
+        array. Each block is filtered with some padding on both sides so
+        the STFT has context at the seams; only the block itself is kept.
+        noisereduce's own chunking is bypassed (it spills to a temp memmap).
+        """
+        # imported here, not at module level: noisereduce pulls in torch, and
+        # preprocess workers should only pay for that when denoising is on
+        try:
+            import noisereduce as nr
+        except ImportError as e:
+            raise AudioProcessingError(f"Denoising needs the noisereduce package: {e}") from e
+
+        n = len(audio)
+        step = max(1, int(self.config.denoise_chunk_sec * sr))
+        pad = max(0, int(self.config.denoise_padding_sec * sr))
+        out = np.empty(n, dtype=np.float32)
+
+        for start in range(0, n, step):
+            end = min(start + step, n)
+            lo, hi = max(0, start - pad), min(n, end + pad)
+            block = audio[lo:hi]
+            cleaned = nr.reduce_noise(
+                y=block,
+                sr=sr,
+                stationary=self.config.denoise_stationary,
+                prop_decrease=self.config.denoise_prop_decrease,
+                chunk_size=len(block),
+                padding=0,
+                n_jobs=1,
+            )
+            out[start:end] = cleaned[start - lo:end - lo]
+
+        return out
+
     def _trim_silence_vad(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        speech = self._vad_frame_mask(audio, sr)
+        if not speech.any():
+            return audio
+
+        frame_len = int(sr * self.config.vad_frame_ms / 1000)
+        speech = self._smooth_vad_mask(speech, frame_len, sr)
+
+        # One gather over the original float32 samples; the trailing partial
+        # frame is dropped, as before.
+        sample_mask = np.repeat(speech, frame_len)
+        return audio[: sample_mask.size][sample_mask]
+
+    def _vad_frame_mask(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Run WebRTC VAD over fixed frames and return one bool per frame.
+        The clip is quantized to int16 once; each frame handed to the VAD is
+        a zero-copy memoryview slice of that buffer. Frames below the energy
+        floor are marked as silence without calling the VAD at all.
+        """
         vad = webrtcvad.Vad(self.config.vad_mode)
-        frame_ms = 30
-        frame_len = int(sr * frame_ms / 1000)
+        frame_len = int(sr * self.config.vad_frame_ms / 1000)
+        num_frames = len(audio) // frame_len
+        if num_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = audio[: num_frames * frame_len].reshape(num_frames, frame_len)
+        energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+        floor = 10.0 ** (self.config.vad_energy_floor_db / 10.0)
+        candidates = np.flatnonzero(energy > floor)
+
+        speech = np.zeros(num_frames, dtype=bool)
+        if candidates.size == 0:
+            return speech
+
+        pcm = np.empty(num_frames * frame_len, dtype=np.int16)
+        np.multiply(np.clip(frames.ravel(), -1.0, 32767 / 32768), 32768, out=pcm, casting="unsafe")
+
+        raw = memoryview(pcm).cast("B")
+        frame_bytes = frame_len * 2
+        is_speech = vad.is_speech
+
+        speech[candidates] = np.fromiter(
+            (is_speech(raw[i * frame_bytes:(i + 1) * frame_bytes], sr) for i in candidates.tolist()),
+            dtype=bool,
+            count=candidates.size,
+        )
+        return speech
 
-        audio_bytes = (audio * 32768).astype(np.int16).tobytes()
-        voiced = []
+    def _smooth_vad_mask(self, speech: np.ndarray, frame_len: int, sr: int) -> np.ndarray:
+        """
+        Close short non-speech gaps and pad every speech run on both sides
+        (hangover) so word onsets and tails are not clipped.
+        """
+        frame_sec = frame_len / sr
 
-        num_frames = len(audio_bytes) // (frame_len * 2)
-        for i in range(num_frames):
-            start = i * frame_len * 2
-            end = start + frame_len * 2
-            frame = audio_bytes[start:end]
-            if vad.is_speech(frame, sr):
-                voiced.append(frame)
+        gap = int(self.config.vad_min_gap_ms / 1000 / frame_sec) // 2
+        if gap > 0:
+            # closing = dilate then erode by the same radius, fills gaps <= 2 * gap frames
+            speech = _dilate(speech, gap)
+            speech = ~_dilate(~speech, gap)
 
-        if not voiced:
-            return audio
+        pad = int(round(self.config.vad_padding_ms / 1000 / frame_sec))
+        if pad > 0:
+            speech = _dilate(speech, pad)
 
-        out = b"".join(voiced)
-        return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+        return speech
 
     @staticmethod
-    def _chunk_audio(audio: np.ndarray, sr: int, max_sec: float) -> List[np.ndarray]:
-        if audio.size == 0 or max_sec <= 0:
-            return [audio]
+    def _chunk_audio(
+        audio: np.ndarray,
+        sr: int,
+        max_sec: float,
+        overlap_sec: float = 0.0,
+        search_sec: float = 0.0,
+    ) -> List[AudioChunk]:
+        spans = AudioPreprocessor._chunk_spans(audio, sr, max_sec, overlap_sec, search_sec)
+
+        chunks = []
+        prev_end = 0
+        for start, end in spans:
+            chunks.append(
+                AudioChunk(
+                    audio=audio[start:end],
+                    start_sec=start / sr,
+                    end_sec=end / sr,
+                    overlap_sec=max(prev_end - start, 0) / sr,
+                )
+            )
+            prev_end = end
+        return chunks
 
+    @staticmethod
+    def _chunk_spans(
+        audio: np.ndarray,
+        sr: int,
+        max_sec: float,
+        overlap_sec: float = 0.0,
+        search_sec: float = 0.0,
+    ) -> List[Tuple[int, int]]:
+        """
+        Sample spans of at most max_sec. With search_sec > 0 every cut is
+        moved back to the lowest-energy frame within search_sec of the
+        nominal cut, so chunks end in pauses rather than mid-word.
+        """
+        total = len(audio)
         max_samples = int(sr * max_sec)
-        if len(audio) <= max_samples:
-            return [audio]
+        if total == 0 or max_sec <= 0 or total <= max_samples:
+            return [(0, total)]
+
+        overlap = min(int(sr * max(overlap_sec, 0.0)), max_samples // 2)
+        # a cut moves back by up to `search` and the next chunk starts `overlap`
+        # before it; keep the two within half a chunk so every step advances
+        # at least max_samples // 2 (otherwise spans could creep by one sample)
+        search = max(0, min(int(sr * max(search_sec, 0.0)), max_samples // 2 - overlap))
+
+        frame_len = max(int(sr * _SNAP_FRAME_MS / 1000), 1)
+        energy = None
+        if search >= frame_len:
+            num_frames = total // frame_len
+            frames = audio[: num_frames * frame_len].reshape(num_frames, frame_len)
+            energy = np.einsum("ij,ij->i", frames, frames)
+
+        spans = []
+        start = 0
+        while total - start > max_samples:
+            end = start + max_samples
+            if energy is not None:
+                lo = (end - search) // frame_len
+                hi = min(end // frame_len, len(energy))
+                if hi > lo:
+                    quietest = lo + int(np.argmin(energy[lo:hi]))
+                    end = quietest * frame_len + frame_len // 2
+
+            spans.append((start, end))
+            start = max(end - overlap, start + 1)
+
+        spans.append((start, total))
+        return spans
+
+
+class StreamingVAD:
+    """
+    Incremental WebRTC VAD over a live mono s16le PCM stream at
+    config.target_sample_rate. Feed bytes as they arrive; an utterance is
+    returned once endpoint_ms of silence follows speech, or when it reaches
+    max_utterance_sec. Speech onsets keep config.vad_padding_ms of pre-roll.
+    """
 
-        return [
-            audio[i:i + max_samples]
-            for i in range(0, len(audio), max_samples)
-        ]
+    def __init__(
+        self,
+        config: Optional[AudioPreprocessorConfig] = None,
+        endpoint_ms: int = 600,
+        max_utterance_sec: float = 30.0,
+    ):
+        self.config = config or AudioPreprocessorConfig()
+        self.sample_rate = self.config.target_sample_rate
+        self.frame_len = int(self.sample_rate * self.config.vad_frame_ms / 1000)
+
+        frame_ms = self.config.vad_frame_ms
+        self.endpoint_frames = max(1, endpoint_ms // frame_ms)
+        self.pad_frames = self.config.vad_padding_ms // frame_ms
+        self.max_frames = max(1, int(max_utterance_sec * 1000 / frame_ms))
+
+        self._vad = webrtcvad.Vad(self.config.vad_mode)
+        self._pending = bytearray()
+        self._preroll: Deque[bytes] = deque(maxlen=max(self.pad_frames, 1))
+        self._frames: List[bytes] = []
+        self._silence = 0
+        self._start = 0
+        # samples consumed so far; used for utterance timestamps
+        self._position = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._frames)
+
+    def feed(self, data: bytes) -> List[AudioChunk]:
+        self._pending += data
+        frame_bytes = self.frame_len * 2
+        num_frames = len(self._pending) // frame_bytes
+
+        done = []
+        with memoryview(self._pending) as view:
+            for i in range(num_frames):
+                frame = bytes(view[i * frame_bytes:(i + 1) * frame_bytes])
+                utterance = self._push(frame)
+                if utterance is not None:
+                    done.append(utterance)
+        del self._pending[: num_frames * frame_bytes]
+
+        return done
+
+    def current(self) -> Optional[AudioChunk]:
+        """The utterance in progress, if any (for partial hypotheses)."""
+        if not self._frames:
+            return None
+        return self._chunk(self._frames)
+
+    def flush(self) -> Optional[AudioChunk]:
+        """Close the utterance in progress at end of stream."""
+        if not self._frames:
+            return None
+        return self._close()
+
+    def _push(self, frame: bytes) -> Optional[AudioChunk]:
+        speech = self._vad.is_speech(frame, self.sample_rate)
+        utterance = None
+
+        if not self._frames:
+            if speech:
+                self._start = self._position - len(self._preroll) * self.frame_len
+                self._frames = list(self._preroll) + [frame]
+                self._preroll.clear()
+                self._silence = 0
+            elif self.pad_frames:
+                self._preroll.append(frame)
+        else:
+            self._frames.append(frame)
+            self._silence = 0 if speech else self._silence + 1
+            if self._silence >= self.endpoint_frames or len(self._frames) >= self.max_frames:
+                utterance = self._close()
+
+        self._position += self.frame_len
+        return utterance
+
+    def _close(self) -> AudioChunk:
+        # keep pad_frames of the trailing silence as hangover
+        frames = self._frames[: len(self._frames) - max(self._silence - self.pad_frames, 0)]
+        utterance = self._chunk(frames)
+        self._frames = []
+        self._silence = 0
+        return utterance
+
+    def _chunk(self, frames: List[bytes]) -> AudioChunk:
+        pcm = np.frombuffer(b"".join(frames), dtype=np.int16)
+        start = self._start / self.sample_rate
+        return AudioChunk(
+            audio=pcm.astype(np.float32) / 32768.0,
+            start_sec=start,
+            end_sec=start + len(pcm) / self.sample_rate,
+        )
@@ -3,9 +3,10 @@ from langchain_core.output_parsers import JsonOutputParser
 
 from pydantic import BaseModel, Field
 from typing import List, Annotated
-import re
 
 from ai_ml.ModelCreator import HFModelCreation
+from ai_ml.JSONExtractor import extract_json, output_text
+from ai_ml.LLMBatcher import JSONObjectComplete, bind_json_schema, invoke_chain
 from ai_ml.AIExceptions import *
 
 class EvalSchema(BaseModel):
@@ -19,27 +20,39 @@ class EvalSchema(BaseModel):
 
 class EvaluationEngine():
 
-    def __init__(self, model_name: str, global_model = None):
+    # new-token budget: the JSON skeleton, plus strengths / weaknesses that
+    # grow with the rubric and a justification that grows with the marks
+    BASE_TOKENS = 160
+    TOKENS_PER_RUBRIC_ITEM = 48
+    TOKENS_PER_MARK = 4
+
+    def __init__(self, model_name: str, global_model = None, constrained: bool = False):
         self.model_name = model_name
         self.model = global_model
+        # decode straight into EvalSchema JSON when the model supports it
+        self.constrained = constrained
+        # prompt | model chain and its parser, built once per engine
+        self._chain = None
 
     def get_model(self):
         if self.model is None:
             self.model = HFModelCreation.hf_model_creator(self.model_name)
         return self.model
 
-    def sanitize_json(self, text: str) -> str:
-        text = text.replace("```json", "").replace("```", "").strip()
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            text = match.group(0)
-        text = re.sub(r",\s*}", "}", text)
-        text = re.sub(r",\s*]", "]", text)
-        return text
+    def token_budget(self, input_features: dict) -> int:
+        rubric = input_features.get("rubric") or []
+        items = len(rubric) if isinstance(rubric, list) else 1
+        marks = int(float(input_features.get("max_marks") or 10))
+        return self.BASE_TOKENS + self.TOKENS_PER_RUBRIC_ITEM * items + self.TOKENS_PER_MARK * marks
 
     def create_evaluation_chain(self):
+        if self._chain is not None:
+            return self._chain
+
         try:
             parser = JsonOutputParser(pydantic_object=EvalSchema)
+            # with constrained decoding the schema is enforced, not described in the prompt
+            llm = bind_json_schema(self.get_model(), EvalSchema) if self.constrained else None
 
             template = """
 You are a very strict exam evaluation engine.
@@ -64,11 +77,11 @@ Maximum Marks: {max_marks}
             prompt = PromptTemplate(
                 template=template,
                 input_variables=["rubric", "question_text", "student_answer", "max_marks"],
-                partial_variables={"format_instructions": parser.get_format_instructions()},
+                partial_variables={"format_instructions": "" if llm else parser.get_format_instructions()},
             )
 
-            chain = prompt | self.get_model()
-            return chain, parser
+            self._chain = (prompt | (llm or self.get_model()), parser)
+            return self._chain
 
         except Exception as e:
             raise ChainCreationException(f"Could not create chain due to error {str(e)}")
@@ -77,26 +90,14 @@ Maximum Marks: {max_marks}
         try:
 
             chain, parser = self.create_evaluation_chain()
-            raw = chain.invoke(input_features)
-
-            # Extract actual text reliably
-            if isinstance(raw, dict) and "text" in raw:
-                output = raw["text"]
-
-            elif isinstance(raw, dict) and "generated_text" in raw:
-                output = raw["generated_text"]
-
-            elif hasattr(raw, "generations"):
-                output = raw.generations[0][0].text
-
-            elif isinstance(raw, list) and isinstance(raw[0], dict) and "generated_text" in raw[0]:
-                output = raw[0]["generated_text"]
-
-            else:
-                output = str(raw)
-
-            cleaned = self.sanitize_json(output)
-            return parser.parse(cleaned)
+            raw = invoke_chain(
+                chain,
+                input_features,
+                max_new_tokens=self.token_budget(input_features),
+                stop_rule=JSONObjectComplete(),
+                task="evaluation",
+            )
+            return parser.parse(extract_json(output_text(raw)))
 
         except Exception as e:
             print("Evaluation Error:", e)
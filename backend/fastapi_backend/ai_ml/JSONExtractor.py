@@ -0,0 +1,136 @@
+import json
+import re
+from typing import List
+
+from ai_ml.AIExceptions import OutputParsingException
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# a bare (unquoted) value that is complete: literal or JSON number
+_SCALAR = re.compile(r"true|false|null|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+
+
+def output_text(raw) -> str:
+    """Completion text from the shapes an LLM / pipeline / chain can return."""
+    if isinstance(raw, str):
+        return raw
+
+    if isinstance(raw, dict):
+        for key in ("text", "generated_text", "output_text"):
+            if key in raw:
+                return raw[key]
+        return json.dumps(raw, default=str)
+
+    if hasattr(raw, "generations"):
+        return raw.generations[0][0].text
+
+    if isinstance(raw, list) and raw and isinstance(raw[0], dict) and "generated_text" in raw[0]:
+        return raw[0]["generated_text"]
+
+    return str(raw)
+
+
+def _drop_trailing_comma(out: List[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _drop_partial_scalar(out: List[str]):
+    """Remove a bare value cut off mid-token (`tr`, `1.`, `-`) from the end of `out`."""
+    while out and out[-1].isspace():
+        out.pop()
+    start = len(out)
+    while start and not out[start - 1].isspace() and out[start - 1] not in ',:[{"':
+        start -= 1
+    if start < len(out) and not _SCALAR.fullmatch("".join(out[start:])):
+        del out[start:]
+
+
+def extract_json(text: str) -> str:
+    """
+    First JSON object in `text`, found in a single pass that tracks strings,
+    escapes and bracket nesting (markdown fences and any prose around the
+    object are skipped). Small defects are repaired in place instead of
+    failing the generation:
+
+    - trailing commas before `}` / `]`
+    - stray closing brackets and mismatched ones (inner brackets are closed)
+    - output truncated mid-object: open strings and brackets are closed, a
+      partial literal or number is dropped, and so is a key left without a
+      complete value
+    """
+    start = text.find("{")
+    if start < 0:
+        raise OutputParsingException("No JSON object found in model output")
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    # last significant character outside strings, and where the last object
+    # key started in `out` (to drop a member cut off before its value)
+    prev = ""
+    key_start = -1
+    in_key = False
+
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                prev = ch
+            continue
+
+        if ch == '"':
+            in_string = True
+            in_key = stack[-1] == "}" and prev in "{,"
+            if in_key:
+                key_start = len(out)
+            out.append(ch)
+
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+
+        elif ch in "}]":
+            if ch not in stack:
+                continue
+            while True:
+                _drop_trailing_comma(out)
+                closer = stack.pop()
+                out.append(closer)
+                if closer == ch:
+                    break
+            if not stack:
+                return "".join(out)
+
+        else:
+            out.append(ch)
+
+        if not ch.isspace():
+            prev = ch
+
+    # ran out of text before the object closed
+    if in_string:
+        if in_key:
+            del out[key_start:]
+        else:
+            if escape:
+                out.pop()
+            out.append('"')
+    else:
+        _drop_partial_scalar(out)
+        last = next((ch for ch in reversed(out) if not ch.isspace()), "")
+        # in_key: the last string was a key, so `"key"` or `"key":` is dangling
+        if in_key and last in '":':
+            del out[key_start:]
+
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out)
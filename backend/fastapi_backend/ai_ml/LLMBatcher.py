@@ -0,0 +1,408 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type
+
+from langchain_core.outputs import Generation, LLMResult
+from langchain_huggingface import HuggingFacePipeline
+from pydantic import BaseModel, PrivateAttr
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+try:
+    import torch
+except Exception:
+    torch = None
+
+try:
+    from lmformatenforcer import JsonSchemaParser
+    from lmformatenforcer.integrations.transformers import (
+        build_token_enforcer_tokenizer_data,
+        build_transformers_prefix_allowed_tokens_fn,
+    )
+except Exception:
+    JsonSchemaParser = None
+
+
+class StopRule:
+    """
+    Per-request early stop. Fed the decoded text of each new token of its
+    row; returns True once the output is complete, which ends that row while
+    the rest of the batch carries on. Stateful: one instance per request.
+    """
+
+    reason = "rule"
+
+    def feed(self, text: str) -> bool:
+        raise NotImplementedError
+
+
+class JSONObjectComplete(StopRule):
+    """Stops as soon as the first top-level JSON object closes."""
+
+    reason = "json"
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text: str) -> bool:
+        for ch in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == "{" or (ch == "[" and self.depth):
+                self.depth += 1
+            elif self.depth and ch == '"':
+                self.in_string = True
+            elif self.depth and ch in "}]":
+                self.depth -= 1
+                if not self.depth:
+                    return True
+        return False
+
+
+class NthMarkerLine(StopRule):
+    """Stops at the end of the line holding the count-th `marker`, e.g. the last MCQ's "Answer:"."""
+
+    reason = "marker"
+
+    def __init__(self, marker: str, count: int):
+        self.marker = marker
+        self.count = count
+        self.seen = 0
+        # enough trailing text to spot a marker split across tokens
+        self.tail = ""
+        self.after = ""
+
+    def feed(self, text: str) -> bool:
+        if self.seen < self.count:
+            window = self.tail + text
+            self.seen += window.count(self.marker)
+            self.tail = window[-(len(self.marker) - 1):] if len(self.marker) > 1 else ""
+            if self.seen < self.count:
+                return False
+            text = window[window.rfind(self.marker) + len(self.marker):]
+
+        # the answer itself, then the newline that ends its line
+        self.after += text
+        return "\n" in self.after.lstrip()
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    future: Future
+    json_schema: Optional[dict] = None
+    max_new_tokens: Optional[int] = None
+    stop_rule: Optional[StopRule] = None
+    # label for the per-request token metric
+    task: str = ""
+
+
+class _RowStopping(StoppingCriteria):
+    """Per-row budgets and stop rules for one batched generate call."""
+
+    def __init__(self, tokenizer, rows: List[GenerationRequest], budgets: List[int], prompt_len: int):
+        self.tokenizer = tokenizer
+        self.rows = rows
+        self.budgets = budgets
+        self.prompt_len = prompt_len
+        self.reasons: List[Optional[str]] = [None] * len(rows)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_len
+        last = input_ids[:, -1].tolist()
+        for i, row in enumerate(self.rows):
+            if self.reasons[i] is not None:
+                continue
+            if last[i] == self.tokenizer.pad_token_id:
+                # finished on EOS (pad is EOS here) in an earlier step
+                self.reasons[i] = "eos"
+            elif row.stop_rule is not None and row.stop_rule.feed(self.tokenizer.decode([last[i]])):
+                self.reasons[i] = row.stop_rule.reason
+            elif generated >= self.budgets[i]:
+                self.reasons[i] = "budget"
+        return torch.tensor([r is not None for r in self.reasons], dtype=torch.bool, device=input_ids.device)
+
+
+class GenerationBatcher:
+    """
+    Dynamic batching in front of one causal LM. Callers on any thread submit
+    a prompt and wait on a Future; a single worker thread takes the first
+    waiting prompt, keeps collecting for up to max_wait_ms (or until
+    max_batch_size prompts are queued), then runs them as ONE left-padded
+    model.generate call and hands every row its own completion. Batches only
+    form if callers block in worker threads (the LLM routes go through
+    run_in_threadpool), never on the event loop.
+
+    Only the newly generated tokens are returned, the prompt is not echoed.
+
+    A row submitted with a json_schema is decoded under lm-format-enforcer:
+    at every step only tokens that keep the output a valid prefix of a JSON
+    document for that schema are allowed. Constrained and free rows can share
+    a batch.
+
+    Every row may carry its own max_new_tokens (clamped to max_new_tokens_cap)
+    and a StopRule; the batch runs until its longest budget and each row is
+    finished as soon as its own budget or rule says so. Tokens generated and
+    budgeted are summed per task label in stats() (GET /llm/stats).
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        generate_kwargs: Optional[Dict[str, Any]] = None,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        max_new_tokens_cap: int = 4096,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.generate_kwargs = dict(generate_kwargs or {})
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_sec = max(0.0, max_wait_ms) / 1000
+        self.max_new_tokens_cap = max_new_tokens_cap
+        # budget for rows submitted without one
+        self.default_max_new_tokens = min(self.generate_kwargs.pop("max_new_tokens", 1200), max_new_tokens_cap)
+
+        # decoder-only models continue from the right edge of the prompt
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._queue: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._stats = {
+            "batches": 0,
+            "rows": 0,
+            "max_batch": 0,
+            "constrained_rows": 0,
+            "tokens_generated": 0,
+            "tokens_budgeted": 0,
+            "stops": {},
+            # per StopRule task label: rows, tokens generated and budgeted
+            "tasks": {},
+        }
+        # tokenizer vocabulary analysis for the enforcer, built on first use
+        self._enforcer_data = None
+        self._all_tokens: Optional[List[int]] = None
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._loop, name="llm-batcher", daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def supports_json_schema() -> bool:
+        return JsonSchemaParser is not None
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def submit(
+        self,
+        prompt: str,
+        json_schema: Optional[dict] = None,
+        max_new_tokens: Optional[int] = None,
+        stop_rule: Optional[StopRule] = None,
+        task: str = "",
+    ) -> Future:
+        if json_schema is not None and not self.supports_json_schema():
+            raise RuntimeError("Schema-constrained decoding needs `pip install lm-format-enforcer`")
+        future: Future = Future()
+        self._queue.put(GenerationRequest(prompt, future, json_schema, max_new_tokens, stop_rule, task))
+        return future
+
+    def generate(self, prompts: List[str], **options) -> List[str]:
+        """Blocking: completions for prompts, batched with whatever else is queued."""
+        futures = [self.submit(prompt, **options) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(
+                self._stats,
+                stops=dict(self._stats["stops"]),
+                tasks={task: dict(t) for task, t in self._stats["tasks"].items()},
+            )
+        for task in stats["tasks"].values():
+            task["mean_tokens"] = task["tokens_generated"] / task["rows"]
+        stats["mean_batch"] = stats["rows"] / stats["batches"] if stats["batches"] else 0.0
+        stats["mean_tokens"] = stats["tokens_generated"] / stats["rows"] if stats["rows"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _collect(self) -> List[GenerationRequest]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # a caller that gave up (cancelled future) does not take a row
+            batch = [row for row in batch if row.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                texts, tokens, reasons, budgets = self._generate_batch(batch)
+            except Exception as e:
+                for row in batch:
+                    row.future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["rows"] += len(batch)
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                self._stats["constrained_rows"] += sum(row.json_schema is not None for row in batch)
+                self._stats["tokens_generated"] += sum(tokens)
+                self._stats["tokens_budgeted"] += sum(budgets)
+                for row, n, reason, budget in zip(batch, tokens, reasons, budgets):
+                    self._stats["stops"][reason] = self._stats["stops"].get(reason, 0) + 1
+                    task = self._stats["tasks"].setdefault(
+                        row.task or "-", {"rows": 0, "tokens_generated": 0, "tokens_budgeted": 0}
+                    )
+                    task["rows"] += 1
+                    task["tokens_generated"] += n
+                    task["tokens_budgeted"] += budget
+
+            for row, text in zip(batch, texts):
+                row.future.set_result(text)
+
+    def _prefix_allowed_tokens_fn(self, schemas: List[Optional[dict]]):
+        """One prefix_allowed_tokens_fn for the batch, dispatching to each row's enforcer."""
+        if self._enforcer_data is None:
+            self._enforcer_data = build_token_enforcer_tokenizer_data(self.tokenizer)
+            self._all_tokens = list(range(self.model.config.vocab_size))
+
+        # a fresh enforcer per row: it keeps per-sequence state for the whole generation
+        row_fns = [
+            build_transformers_prefix_allowed_tokens_fn(self._enforcer_data, JsonSchemaParser(schema))
+            if schema is not None else None
+            for schema in schemas
+        ]
+
+        def allowed(batch_id: int, input_ids) -> List[int]:
+            row_fn = row_fns[batch_id]
+            return self._all_tokens if row_fn is None else row_fn(batch_id, input_ids)
+
+        return allowed
+
+    def _generate_batch(self, batch: List[GenerationRequest]):
+        """Completions, tokens generated, stop reason and budget of every row."""
+        budgets = [
+            min(row.max_new_tokens or self.default_max_new_tokens, self.max_new_tokens_cap)
+            for row in batch
+        ]
+        encoded = self.tokenizer([row.prompt for row in batch], return_tensors="pt", padding=True).to(self.model.device)
+        prompt_len = encoded["input_ids"].shape[1]
+
+        generate_kwargs = dict(self.generate_kwargs, max_new_tokens=max(budgets))
+        schemas = [row.json_schema for row in batch]
+        if any(schema is not None for schema in schemas):
+            generate_kwargs["prefix_allowed_tokens_fn"] = self._prefix_allowed_tokens_fn(schemas)
+
+        stopping = None
+        if any(row.stop_rule is not None for row in batch) or len(set(budgets)) > 1:
+            stopping = _RowStopping(self.tokenizer, batch, budgets, prompt_len)
+            generate_kwargs["stopping_criteria"] = StoppingCriteriaList([stopping])
+
+        with torch.inference_mode():
+            output = self.model.generate(**encoded, **generate_kwargs)
+
+        # rows are left-padded to the same length, so new tokens start at the same column;
+        # a finished row is filled with pad tokens up to the longest one
+        new_tokens = output[:, prompt_len:]
+        tokens = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        reasons = [
+            (stopping.reasons[i] if stopping is not None else None)
+            or ("budget" if tokens[i] >= budgets[i] else "eos")
+            for i in range(len(batch))
+        ]
+        texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        return texts, tokens, reasons, budgets
+
+
+class BatchedHuggingFacePipeline(HuggingFacePipeline):
+    """
+    HuggingFacePipeline whose generation goes through a GenerationBatcher,
+    so concurrent chain.invoke calls from different request threads share
+    batched generate calls. Drop-in for `prompt | llm` chains.
+    """
+
+    # prepend the prompt to each completion, like the pipeline's return_full_text
+    return_full_text: bool = False
+
+    _batcher: GenerationBatcher = PrivateAttr()
+
+    def __init__(self, batcher: GenerationBatcher, **kwargs):
+        super().__init__(**kwargs)
+        self._batcher = batcher
+
+    @property
+    def batcher(self) -> GenerationBatcher:
+        return self._batcher
+
+    @property
+    def _llm_type(self) -> str:
+        return "batched_huggingface_pipeline"
+
+    def _generate(self, prompts: List[str], stop=None, run_manager=None, **kwargs) -> LLMResult:
+        # json_schema arrives through llm.bind(json_schema=...), see bind_json_schema;
+        # per-call budgets and stop rules through invoke_chain
+        options = {key: kwargs[key] for key in ("json_schema", "max_new_tokens", "stop_rule", "task") if key in kwargs}
+        texts = self._batcher.generate(prompts, **options)
+        if self.return_full_text:
+            texts = [prompt + text for prompt, text in zip(prompts, texts)]
+        return LLMResult(generations=[[Generation(text=text)] for text in texts])
+
+
+def bind_json_schema(llm, schema: Type[BaseModel]):
+    """
+    `llm` with decoding constrained to JSON valid for the pydantic `schema`,
+    or None when that is not possible (not a batched pipeline, or
+    lm-format-enforcer is not installed) and the caller should fall back to
+    format instructions in the prompt.
+    """
+    if not isinstance(llm, BatchedHuggingFacePipeline) or not llm.batcher.supports_json_schema():
+        return None
+    return llm.bind(json_schema=schema.model_json_schema())
+
+
+def echo_tokens(llm, *values) -> int:
+    """
+    Tokens the model spends copying `values` into its JSON output (as quoted
+    strings), for token budgets. Counted with the batcher's tokenizer; other
+    LLMs take no budget, so they get a rough characters / 3 estimate.
+    """
+    text = " ".join(json.dumps(str(value)) for value in values)
+    if isinstance(llm, BatchedHuggingFacePipeline):
+        return llm.batcher.count_tokens(text)
+    return len(text) // 3
+
+
+def invoke_chain(chain, inputs: dict, **options):
+    """
+    chain.invoke(inputs) for a `prompt | llm` chain, forwarding per-call
+    generation options (max_new_tokens, stop_rule, task) to the LLM when it
+    is a BatchedHuggingFacePipeline. Any other LLM is invoked without them.
+    """
+    llm = chain.last
+    # a RunnableBinding from bind_json_schema wraps the pipeline
+    if not isinstance(getattr(llm, "bound", llm), BatchedHuggingFacePipeline):
+        return chain.invoke(inputs)
+    return llm.invoke(chain.first.invoke(inputs), **options)
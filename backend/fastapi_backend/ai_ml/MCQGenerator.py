@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field
 from langchain_core.prompts import PromptTemplate
 
 from ai_ml.ModelCreator import HFModelCreation
+from ai_ml.LLMBatcher import NthMarkerLine, invoke_chain
 from ai_ml.AIExceptions import *
 
 
@@ -25,16 +26,28 @@ class MCQOutput(BaseModel):
 
 class MCQGenerator:
 
+    # question, four options and the answer line
+    BASE_TOKENS = 32
+    TOKENS_PER_MCQ = 110
+
     def __init__(self, model_name: str, global_model=None):
         self.model_name = model_name
         self.model = global_model
+        # prompt | model chain, built on first use
+        self._chain = None
 
     def get_model(self):
         if self.model is None:
             self.model = HFModelCreation.hf_model_creator(self.model_name)
         return self.model
 
+    def token_budget(self, input_request: dict) -> int:
+        return self.BASE_TOKENS + self.TOKENS_PER_MCQ * int(input_request["num_questions"])
+
     def create_chain(self):
+        if self._chain is not None:
+            return self._chain
+
         try:
             # Use simple text format instead of JSON - much easier for model to generate
             template = """You are an expert exam paper setter.
@@ -72,9 +85,9 @@ Now generate {num_questions} MCQs with sequential numbering:"""
                 input_variables=["num_questions", "topic_id", "topic", "subject"]
             )
 
-            chain = prompt | self.get_model()
+            self._chain = prompt | self.get_model()
 
-            return chain
+            return self._chain
 
         except Exception as e:
             raise ChainCreationException(
@@ -92,7 +105,14 @@ Now generate {num_questions} MCQs with sequential numbering:"""
     def generate(self, input_request: dict) -> MCQOutput:
         chain = self.create_chain()
 
-        raw_output = chain.invoke(input_request)
+        # done once the last question's "Answer:" line is out
+        raw_output = invoke_chain(
+            chain,
+            input_request,
+            max_new_tokens=self.token_budget(input_request),
+            stop_rule=NthMarkerLine("Answer:", int(input_request["num_questions"])),
+            task="mcq",
+        )
         output_text = self.extract_text(raw_output)
 
         # Parse the plain text MCQs into structured format
@@ -1,8 +1,14 @@
+import threading
+import time
+from collections import OrderedDict
+
 from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from langchain_huggingface import HuggingFacePipeline
+from ai_ml.LLMBatcher import BatchedHuggingFacePipeline, GenerationBatcher
 
 import whisper
 
+from ai_ml.AIExceptions import IllegalModelSelectionException
+
 from sentence_transformers import SentenceTransformer, util
 
 try:
@@ -10,12 +16,27 @@ try:
 except Exception:
     torch = None
 
+# optional CTranslate2 runtime for the "ct2" STT backend
+try:
+    from faster_whisper import WhisperModel as CT2WhisperModel
+except Exception:
+    CT2WhisperModel = None
+
 class HFModelCreation:
     def __init__(self):
         pass
     
     @staticmethod
-    def hf_model_creator(model_name: str):
+    def hf_model_creator(
+        model_name: str,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        max_new_tokens_cap: int = 4096,
+    ):
+        """
+        Text-generation model shared by all LLM engines. Concurrent prompts
+        are batched by a GenerationBatcher (see ai_ml/LLMBatcher.py).
+        """
         try:
             tokenizer = AutoTokenizer.from_pretrained(
                 model_name, trust_remote_code=True
@@ -30,34 +51,230 @@ class HFModelCreation:
 
             tokenizer.pad_token = tokenizer.eos_token
 
-            gen = pipeline(
-                "text-generation",
-                model=model,
-                tokenizer=tokenizer,
-                max_new_tokens=1200,
+            generate_kwargs = dict(
+                max_new_tokens=1200,  # for prompts submitted without their own budget
                 temperature=0.3,
                 do_sample=False,
                 eos_token_id=tokenizer.eos_token_id,
                 pad_token_id=tokenizer.eos_token_id,
-                return_full_text=True
             )
 
+            gen = pipeline(
+                "text-generation",
+                model=model,
+                tokenizer=tokenizer,
+                # completions only: an echoed prompt carries the JSON format
+                # instructions, which output parsing could mistake for the answer
+                return_full_text=False,
+                **generate_kwargs,
+            )
 
-            return HuggingFacePipeline(pipeline=gen)
+            batcher = GenerationBatcher(
+                model,
+                tokenizer,
+                generate_kwargs=generate_kwargs,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                max_new_tokens_cap=max_new_tokens_cap,
+            )
+
+            return BatchedHuggingFacePipeline(batcher, pipeline=gen, return_full_text=False)
 
         except Exception as e:
             print("Error loading HF model:", e)
             return None
 
 
+def quantize_whisper_int8(model):
+    """
+    Dynamic int8 quantization of a CPU Whisper model's Linear layers
+    (attention projections + MLPs, the bulk of decoder time). Weights are
+    stored as int8, activations are quantized on the fly per batch.
+
+    whisper.model.Linear only overrides forward() to cast weights to the
+    input dtype, which is a no-op in fp32; quantize_dynamic matches modules
+    by exact type, so those layers are turned back into plain nn.Linear first.
+    """
+    if torch is None:
+        raise RuntimeError("torch is required for int8 quantization")
+
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return model.eval()
+
+
+# parameter counts (millions) of the released Whisper sizes, to estimate a
+# model's memory before it is loaded; ".en" and "-v2"/"-v3" variants share them
+_WHISPER_PARAMS_M = {"tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550, "turbo": 809}
+
+
+class WhisperModelRegistry:
+    """
+    Whisper models of several sizes (tiny/base/small/...) in one process.
+    Models load lazily on first use; before a load, least recently used
+    unpinned models are dropped until the estimated size of the new model
+    fits the RAM budget. Load time and hit counts are tracked per model.
+
+    The registry lock only guards bookkeeping. Loads run outside it, one at a
+    time per size, so stats() and hits on other sizes never wait for a load.
+    """
+
+    def __init__(self, budget_bytes: int = 4 * 1024 ** 3, allowed=None, quantize_int8: bool = False):
+        self.budget_bytes = budget_bytes
+        # None = anything whisper.available_models() knows
+        self.allowed = allowed
+        # only applied to models that land on CPU
+        self.quantize_int8 = quantize_int8
+        self._models = OrderedDict()
+        self._sizes = {}
+        # measured size of every model loaded so far, kept across evictions
+        self._measured = {}
+        # estimated bytes of loads in flight, counted against the budget
+        self._reserved = {}
+        self._pinned = set()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name: str, pin: bool = False):
+        name = name.lower()
+        self.validate(name)
+
+        with self._lock:
+            if pin:
+                self._pinned.add(name)
+            model = self._hit(name)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # loaded by another thread while this one waited
+                model = self._hit(name)
+                if model is not None:
+                    return model
+                estimate = self._estimated_bytes(name)
+                self._evict_for(estimate)
+                self._reserved[name] = estimate
+
+            try:
+                start = time.perf_counter()
+                model = whisper.load_model(name)
+                if self.quantize_int8 and model.device.type == "cpu":
+                    model = quantize_whisper_int8(model)
+                load_sec = time.perf_counter() - start
+                size = self._resident_bytes(model)
+            finally:
+                with self._lock:
+                    self._reserved.pop(name, None)
+
+            with self._lock:
+                stats = self._stats_for(name)
+                stats["last_load_sec"] = load_sec
+                stats["loads"] += 1
+                self._measured[name] = size
+                # the estimate can be off; trim others if the real size does not fit
+                self._evict_for(size)
+                self._models[name] = model
+                self._sizes[name] = size
+                return model
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": sum(self._sizes.values()),
+                "loaded": list(self._models),
+                "loading": list(self._reserved),
+                "models": {
+                    name: {
+                        **stats,
+                        "resident_bytes": self._sizes.get(name),
+                        "pinned": name in self._pinned,
+                    }
+                    for name, stats in self._stats.items()
+                },
+            }
+
+    def validate(self, name: str):
+        allowed = self.allowed if self.allowed is not None else whisper.available_models()
+        if name not in allowed:
+            raise IllegalModelSelectionException(
+                f"Whisper model '{name}' is not available. Choose one of: {', '.join(allowed)}"
+            )
+
+    def _stats_for(self, name: str) -> dict:
+        return self._stats.setdefault(name, {"loads": 0, "hits": 0, "evictions": 0, "last_load_sec": None})
+
+    def _hit(self, name: str):
+        # caller holds self._lock
+        if name not in self._models:
+            return None
+        self._models.move_to_end(name)
+        self._stats_for(name)["hits"] += 1
+        return self._models[name]
+
+    def _estimated_bytes(self, name: str) -> int:
+        if name in self._measured:
+            return self._measured[name]
+        params_m = _WHISPER_PARAMS_M.get(name.split(".")[0].split("-")[0], _WHISPER_PARAMS_M["large"])
+        # fp32 weights; dynamic int8 quantization leaves roughly a third (Linear weights at 1 byte)
+        bytes_per_param = 4 / 3 if self.quantize_int8 else 4
+        return int(params_m * 1e6 * bytes_per_param)
+
+    def _evict_for(self, incoming: int):
+        # caller holds self._lock; walk from least to most recently used, pinned models always stay
+        for name in list(self._models):
+            if sum(self._sizes.values()) + sum(self._reserved.values()) + incoming <= self.budget_bytes:
+                break
+            if name in self._pinned:
+                continue
+            del self._models[name]
+            del self._sizes[name]
+            self._stats[name]["evictions"] += 1
+
+    @staticmethod
+    def _resident_bytes(model) -> int:
+        # state_dict also covers quantized layers, whose packed int8
+        # weights are neither parameters nor buffers
+        def tensors(value):
+            if isinstance(value, torch.Tensor):
+                yield value
+            elif isinstance(value, (tuple, list)):
+                for item in value:
+                    yield from tensors(item)
+
+        return sum(
+            t.numel() * t.element_size()
+            for value in model.state_dict().values()
+            for t in tensors(value)
+        )
+
+
 class SpeechModelGenerator:
     """
     Loads Whisper / HF Whisper models ONCE per process.
     Used when user does NOT preload models via FastAPI startup.
     """
-    _whisper_model = None
     _hf_model = None
 
+    # default size for whisper.load_model; also part of transcription cache keys
+    whisper_model_name = "base"
+    whisper_registry = WhisperModelRegistry()
+    hf_model_name = "openai/whisper-large-v3"
+
+    _ct2_model = None
+    # faster-whisper size / path and CTranslate2 weight type
+    ct2_model_name = "base"
+    ct2_compute_type = "int8"
+    ct2_cpu_threads = 0  # 0 = CTranslate2 default
+
     @staticmethod
     def _get_default_device():
         """Return -1 (CPU) or 0 (GPU)."""
@@ -69,12 +286,21 @@ class SpeechModelGenerator:
         return -1
 
     @classmethod
-    def whisper_model_generator(cls):
-        """Lazy-load Whisper Base model."""
+    def whisper_cache_name(cls, name: str = None) -> str:
+        """Identifies the weights a size is served with, e.g. 'whisper-base-int8'."""
+        name = (name or cls.whisper_model_name).lower()
+        suffix = "-int8" if cls.whisper_registry.quantize_int8 and cls._get_default_device() == -1 else ""
+        return f"whisper-{name}{suffix}"
 
-        if cls._whisper_model is None:
-            cls._whisper_model = whisper.load_model("base")
-        return cls._whisper_model
+    @classmethod
+    def whisper_model_generator(cls, name: str = None):
+        """
+        Lazy-load a Whisper model through the registry. The default size is
+        pinned so the model held by app.core.models is never evicted.
+        """
+        if name is None or name.lower() == cls.whisper_model_name:
+            return cls.whisper_registry.get(cls.whisper_model_name, pin=True)
+        return cls.whisper_registry.get(name)
 
     @classmethod
     def hf_model_generator(cls):
@@ -84,8 +310,27 @@ class SpeechModelGenerator:
             device = cls._get_default_device()
             cls._hf_model = pipeline(
                 task="automatic-speech-recognition",
-                model="openai/whisper-large-v3",
-                device=device
+                model=cls.hf_model_name,
+                device=device,
+                # half precision only where it is supported (GPU)
+                torch_dtype=torch.float16 if device == 0 else None,
             )
         return cls._hf_model
 
+    @classmethod
+    def ct2_model_generator(cls):
+        """Lazy-load a faster-whisper (CTranslate2) model."""
+        if CT2WhisperModel is None:
+            raise IllegalModelSelectionException(
+                "The 'ct2' STT backend needs the faster-whisper package."
+            )
+
+        if cls._ct2_model is None:
+            device = "cuda" if cls._get_default_device() == 0 else "cpu"
+            cls._ct2_model = CT2WhisperModel(
+                cls.ct2_model_name,
+                device=device,
+                compute_type=cls.ct2_compute_type,
+                cpu_threads=cls.ct2_cpu_threads,
+            )
+        return cls._ct2_model
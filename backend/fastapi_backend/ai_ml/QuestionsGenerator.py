@@ -3,9 +3,10 @@ from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 
 from pydantic import BaseModel, Field
 from typing import List, Dict, Annotated, Optional
-import re
 
 from ai_ml.ModelCreator import HFModelCreation
+from ai_ml.JSONExtractor import extract_json, output_text
+from ai_ml.LLMBatcher import JSONObjectComplete, bind_json_schema, echo_tokens, invoke_chain
 from ai_ml.AIExceptions import *
 
 
@@ -15,9 +16,14 @@ class OutputResponse(BaseModel):
     questions: Annotated[List[str], Field(title="Questions", description="The questions created by the model")]
 
 class QuestionsGenerator:
-    def __init__(self, model_name: str, global_model = None):
+    BASE_TOKENS = 64
+    TOKENS_PER_QUESTION = 48
+
+    def __init__(self, model_name: str, global_model = None, constrained: bool = False):
         self.model_name = model_name
         self.model = global_model
+        self.constrained = constrained
+        self._chain = None
 
     def get_model(self):
         if self.model is None:
@@ -25,9 +31,18 @@ class QuestionsGenerator:
         return self.model
 
     
+    def token_budget(self, input_request: dict) -> int:
+        # OutputResponse repeats topic_id and topic before the questions
+        echoed = echo_tokens(self.get_model(), input_request.get("topic_id", ""), input_request["topic"])
+        return self.BASE_TOKENS + echoed + self.TOKENS_PER_QUESTION * int(input_request["num_questions"])
+
     def chain_creator(self):
+        if self._chain is not None:
+            return self._chain
+
         try:
             parser = JsonOutputParser(pydantic_object=OutputResponse)
+            llm = bind_json_schema(self.get_model(), OutputResponse) if self.constrained else None
 
             template = """
     You are an exam evaluator. 
@@ -49,28 +64,18 @@ class QuestionsGenerator:
                 template=template,
                 input_variables= ["num_questions", "topic", "subject"],
                 partial_variables= {
-                    "format_instructions": parser.get_format_instructions()
+                    "format_instructions": "" if llm else parser.get_format_instructions()
                 }
             )
 
 
-            chain = prompt | self.get_model()
+            self._chain = (prompt | (llm or self.get_model()), parser)
 
-            return chain, parser
+            return self._chain
 
         except Exception as e:
             raise ChainCreationException(f"Could not create chain due to error {str(e)}")
 
-    def sanitize_json(self, text: str) -> str:
-        text = text.replace("```json", "").replace("```", "").strip()
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
-            text = m.group(0)
-        text = re.sub(r",\s*}", "}", text)
-        text = re.sub(r",\s*]", "]", text)
-        return text
-
-
     def create_questions(self, input_request: dict):
         try:
             if "topic" not in input_request:
@@ -84,26 +89,14 @@ class QuestionsGenerator:
             
             chain, parser = self.chain_creator()
 
-            raw = chain.invoke(input_request)
-
-            # Extract actual text reliably
-            if isinstance(raw, dict) and "text" in raw:
-                output = raw["text"]
-
-            elif isinstance(raw, dict) and "generated_text" in raw:
-                output = raw["generated_text"]
-
-            elif hasattr(raw, "generations"):
-                output = raw.generations[0][0].text
-
-            elif isinstance(raw, list) and isinstance(raw[0], dict) and "generated_text" in raw[0]:
-                output = raw[0]["generated_text"]
-
-            else:
-                output = str(raw)
-
-            cleaned = self.sanitize_json(output)
-            return parser.parse(cleaned)
+            raw = invoke_chain(
+                chain,
+                input_request,
+                max_new_tokens=self.token_budget(input_request),
+                stop_rule=JSONObjectComplete(),
+                task="questions",
+            )
+            return parser.parse(extract_json(output_text(raw)))
 
         except Exception as e:
             raise QuestionsGenerationException(f"Questions generation failed: {str(e)}")
\ No newline at end of file
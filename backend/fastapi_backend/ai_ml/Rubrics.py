@@ -2,12 +2,13 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
 from ai_ml.ModelCreator import HFModelCreation
+from ai_ml.JSONExtractor import extract_json, output_text
+from ai_ml.LLMBatcher import JSONObjectComplete, bind_json_schema, echo_tokens, invoke_chain
 from ai_ml.AIExceptions import *
 
 from pydantic import BaseModel, Field
 from typing import List, Dict, Annotated, Optional
 
-import re
 import json
 
 
@@ -22,28 +23,33 @@ class RubricsResponse(BaseModel):
 
 
 class RubricsEngine():
-    def __init__(self, model_name: str, global_model=None):
+    # roughly one rubric line per mark or two
+    BASE_TOKENS = 96
+    TOKENS_PER_MARK = 32
+
+    def __init__(self, model_name: str, global_model=None, constrained: bool = False):
         self.model_name = model_name
         self.model = global_model
+        self.constrained = constrained
+        self._chain = None
 
     def get_model(self):
         if self.model is None:
             self.model = HFModelCreation.hf_model_creator(self.model_name)
         return self.model
 
-    def sanitize_json(self, text: str) -> str:
-        text = text.replace("```json", "").replace("```", "").strip()
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
-            text = m.group(0)
-        text = re.sub(r",\s*}", "}", text)
-        text = re.sub(r",\s*]", "]", text)
-        return text
+    def token_budget(self, input_features: dict) -> int:
+        # RubricsResponse repeats question_id and question_text before the rubrics
+        echoed = echo_tokens(self.get_model(), input_features.get("question_id", ""), input_features["question_text"])
+        return self.BASE_TOKENS + echoed + self.TOKENS_PER_MARK * int(input_features["max_marks"])
 
     def create_rubrics_chain(self):
+        if self._chain is not None:
+            return self._chain
 
         try:
             parser = JsonOutputParser(pydantic_object=RubricsResponse)
+            llm = bind_json_schema(self.get_model(), RubricsResponse) if self.constrained else None
 
             template = """
 You are an exam evaluator.
@@ -67,12 +73,12 @@ Total Marks: {max_marks}
                 template=template,
                 input_variables=["question_text", "max_marks"],
                 partial_variables={
-                    "format_instructions": parser.get_format_instructions()
+                    "format_instructions": "" if llm else parser.get_format_instructions()
                 }
             )
 
-            chain = prompt | self.get_model()
-            return chain, parser
+            self._chain = (prompt | (llm or self.get_model()), parser)
+            return self._chain
 
         except Exception as e:
             raise ChainCreationException(f"Rubric chain creation error: {str(e)}")
@@ -90,43 +96,14 @@ Total Marks: {max_marks}
 
             chain, parser = self.create_rubrics_chain()
 
-            raw = chain.invoke(input_features)
-
-            # Extract actual text reliably from various return shapes
-            output = None
-
-            # common return shapes
-            if isinstance(raw, dict):
-                # hf pipeline or similar
-                if "text" in raw:
-                    output = raw["text"]
-                elif "generated_text" in raw:
-                    output = raw["generated_text"]
-                else:
-                    # sometimes pipelines return {"output_text": ...}
-                    if "output_text" in raw:
-                        output = raw["output_text"]
-                    else:
-                        output = json.dumps(raw)  # fallback
-
-            elif hasattr(raw, "generations"):
-                # LangChain-like object
-                try:
-                    output = raw.generations[0][0].text
-                except Exception:
-                    output = str(raw)
-
-            elif isinstance(raw, list) and len(raw) > 0:
-                first = raw[0]
-                if isinstance(first, dict) and "generated_text" in first:
-                    output = first["generated_text"]
-                else:
-                    output = str(raw)
-
-            else:
-                output = str(raw)
-
-            cleaned = self.sanitize_json(output)
+            raw = invoke_chain(
+                chain,
+                input_features,
+                max_new_tokens=self.token_budget(input_features),
+                stop_rule=JSONObjectComplete(),
+                task="rubrics",
+            )
+            cleaned = extract_json(output_text(raw))
 
             # parser.parse returns a pydantic model instance - return its dict
             parsed = parser.parse(cleaned)
@@ -2,34 +2,341 @@ from __future__ import annotations
 import warnings
 warnings.filterwarnings("ignore")
 
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
 
+import numpy as np
+import torch
+import whisper
 from transformers import pipeline
 
 from ai_ml.AIExceptions import IllegalModelSelectionException
-from ai_ml.AudioPreprocessor import AudioPreprocessor
+from ai_ml.AudioPreprocessor import AudioPreprocessor, PreprocessResult
 from ai_ml.ModelCreator import SpeechModelGenerator
 
+# Whisper's encoder always sees 30 s of audio
+WHISPER_WINDOW_SEC = 30.0
+
+# lang=auto resolves to this when there is nothing to detect from
+DEFAULT_LANGUAGE = "en"
+
+
+class LongFormConfig:
+    def __init__(
+        self,
+        min_duration_sec: float = 60.0,
+        batch_size: int = 8,
+        mel_workers: int = 2,
+        window_overlap_sec: float = 1.0,
+        max_overlap_words: int = 12,
+    ):
+        # clips shorter than this keep the single-pass whisper.transcribe path
+        self.min_duration_sec = min_duration_sec
+        # 30 s windows decoded together in one batched forward pass
+        self.batch_size = batch_size
+        # threads computing log-mel spectrograms ahead of the decoder
+        self.mel_workers = mel_workers
+        # used when a preprocessed chunk is longer than one window
+        self.window_overlap_sec = window_overlap_sec
+        self.max_overlap_words = max_overlap_words
+
+
+class DecodeProfile:
+    def __init__(
+        self,
+        name: str,
+        beam_size: int | None = None,
+        best_of: int | None = None,
+        temperature: tuple[float, ...] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        condition_on_previous_text: bool = True,
+        without_timestamps: bool = False,
+    ):
+        self.name = name
+        # None = greedy decoding at temperature 0
+        self.beam_size = beam_size
+        # samples drawn at each fallback temperature > 0; None = one, as in
+        # whisper.transcribe (5 is only the command-line default)
+        self.best_of = best_of
+        # a window is re-decoded at the next temperature when it looks like
+        # a hallucination / repetition loop; (0.0,) means a single pass
+        self.temperature = temperature
+        # feed the previous window's text as the prompt of the next one
+        self.condition_on_previous_text = condition_on_previous_text
+        # skip timestamp tokens; only the text is used downstream
+        self.without_timestamps = without_timestamps
+
+    def transcribe_options(self) -> dict:
+        """Keyword arguments for whisper's model.transcribe."""
+        return {
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "temperature": self.temperature,
+            "condition_on_previous_text": self.condition_on_previous_text,
+            "without_timestamps": self.without_timestamps,
+        }
+
+
+# "balanced" is whisper.transcribe's own defaults
+DECODE_PROFILES: dict[str, DecodeProfile] = {
+    "fast": DecodeProfile(
+        "fast",
+        beam_size=None,
+        best_of=None,
+        temperature=(0.0,),
+        condition_on_previous_text=False,
+        without_timestamps=True,
+    ),
+    "balanced": DecodeProfile("balanced"),
+    "accurate": DecodeProfile("accurate", beam_size=5, best_of=5),
+}
+
+
+def decode_profile(name: str | None) -> DecodeProfile:
+    """DECODE_PROFILES lookup; None gives "balanced"."""
+    profile = DECODE_PROFILES.get((name or "balanced").lower())
+    if profile is None:
+        raise IllegalModelSelectionException(
+            f"Decode profile {name} is invalid. Choose one of: {', '.join(DECODE_PROFILES)}."
+        )
+    return profile
+
+
+#   OVERLAP STITCHING
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _overlap_length(prev: list[str], nxt: list[str], max_words: int) -> int:
+    """Longest k such that the last k words of prev equal the first k of nxt."""
+    tail = [_normalize_word(w) for w in prev[-max_words:]]
+    head = [_normalize_word(w) for w in nxt[:max_words]]
+    for k in range(min(len(tail), len(head)), 0, -1):
+        if tail[-k:] == head[:k]:
+            return k
+    return 0
+
+
+def merge_overlapping_texts(texts: list[str], max_overlap_words: int = 12) -> str:
+    """
+    Join per-chunk transcripts in order, dropping the words the next chunk
+    repeats from the overlap region of the previous one.
+    """
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        if merged and words:
+            words = words[_overlap_length(merged, words, max_overlap_words):]
+        merged.extend(words)
+    return " ".join(merged)
+
+
+def _hf_text(result) -> str | None:
+    """Text from the shapes a transformers ASR pipeline can return."""
+    # Handle: [{"text": "..."}]
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return result[0].get("text", "")
+
+    # Handle: {"text": "..."}
+    if isinstance(result, dict):
+        return result.get("text", "")
+
+    # Handle generators
+    if hasattr(result, "__iter__") and not isinstance(result, (dict, list, str)):
+        items = list(result)
+        if items and isinstance(items[0], dict):
+            return items[0].get("text", "")
+
+    return None
+
+
+#   BACKENDS
+class STTBackend(ABC):
+    """
+    One ASR runtime. The model object is loaded lazily and shared per
+    process; transcribe() gets audio that AudioPreprocessor already decoded.
+    """
+    name = ""
+
+    @abstractmethod
+    def load(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def transcribe(self, stt: STT, model, result: PreprocessResult, lang) -> str:
+        raise NotImplementedError
+
+    def detect_language(self, stt: STT, model, result: PreprocessResult) -> str:
+        raise IllegalModelSelectionException(
+            f"Language detection (lang=auto) is not supported by the '{self.name}' backend."
+        )
+
+    def cache_name(self) -> str:
+        """Identifies model + weights in transcription cache keys."""
+        return self.name
+
+    def run(self, stt: STT, result: PreprocessResult, lang=None) -> str:
+        """load + transcribe; meant to be called on the inference thread."""
+        return self.transcribe(stt, self.load(), result, lang or stt.lang)
+
+    def run_detect(self, stt: STT, result: PreprocessResult) -> str:
+        """load + detect_language, on the inference thread."""
+        return self.detect_language(stt, self.load(), result)
+
+
+class WhisperBackend(STTBackend):
+    """openai-whisper (PyTorch), with the batched long-form path."""
+    name = "whisper"
+
+    def __init__(self, size: str | None = None):
+        self.size = size
+
+    def load(self):
+        return SpeechModelGenerator.whisper_model_generator(self.size)
+
+    def transcribe(self, stt: STT, model, result: PreprocessResult, lang) -> str:
+        return stt.transcribe_preprocessed(model, result, lang=lang)
+
+    def detect_language(self, stt: STT, model, result: PreprocessResult) -> str:
+        return stt.detect_language(model, result)
+
+    def cache_name(self) -> str:
+        return SpeechModelGenerator.whisper_cache_name(self.size)
+
+
+class HFWhisperBackend(STTBackend):
+    """transformers ASR pipeline with chunked, batched long-form inference."""
+    name = "hf"
+
+    def __init__(self, chunk_length_s: float = 30.0, batch_size: int = 8):
+        self.chunk_length_s = chunk_length_s
+        self.batch_size = batch_size
+
+    def load(self):
+        return SpeechModelGenerator.hf_model_generator()
+
+    def transcribe(self, stt: STT, model, result: PreprocessResult, lang) -> str:
+        return stt.transcribe_preprocessed_hf(
+            model,
+            result,
+            lang=lang,
+            chunk_length_s=self.chunk_length_s,
+            batch_size=self.batch_size,
+        )
+
+    def detect_language(self, stt: STT, model, result: PreprocessResult) -> str:
+        window = stt.first_window(result)
+        if window is None:
+            return DEFAULT_LANGUAGE
+
+        features = model.feature_extractor(
+            window, sampling_rate=result.sample_rate, return_tensors="pt"
+        ).input_features
+        lang_ids = model.model.detect_language(features.to(model.device, dtype=model.model.dtype))
+        # "<|de|>" -> "de"
+        return model.tokenizer.decode(lang_ids[0])[2:-2]
+
+    def cache_name(self) -> str:
+        return SpeechModelGenerator.hf_model_name
+
+
+class CTranslate2Backend(STTBackend):
+    """
+    faster-whisper on CTranslate2: int8 weights and a C++ decoder, several
+    times faster than PyTorch Whisper on CPU. Optional dependency.
+    """
+    name = "ct2"
+
+    def load(self):
+        return SpeechModelGenerator.ct2_model_generator()
+
+    def detect_language(self, stt: STT, model, result: PreprocessResult) -> str:
+        # same steps faster-whisper's transcribe takes when language=None,
+        # limited to the first 30 s window
+        window = stt.first_window(result)
+        if window is None or not model.model.is_multilingual:
+            return DEFAULT_LANGUAGE
+
+        features = model.feature_extractor(window)
+        encoder_output = model.encode(features[:, : model.feature_extractor.nb_max_frames])
+        token, _ = model.model.detect_language(encoder_output)[0][0]
+        return token[2:-2]
+
+    def transcribe(self, stt: STT, model, result: PreprocessResult, lang) -> str:
+        try:
+            profile = stt.decode_profile
+            # VAD already ran in AudioPreprocessor, the runtime handles > 30 s itself
+            segments, _ = model.transcribe(
+                result.audio,
+                language=lang,
+                beam_size=profile.beam_size or 1,
+                best_of=profile.best_of or 1,
+                temperature=list(profile.temperature),
+                condition_on_previous_text=profile.condition_on_previous_text,
+                without_timestamps=profile.without_timestamps,
+                vad_filter=False,
+            )
+            return " ".join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            print("CTranslate2 transcription failed:", e)
+            return ""
+
+    def cache_name(self) -> str:
+        return f"ct2-{SpeechModelGenerator.ct2_model_name}-{SpeechModelGenerator.ct2_compute_type}"
+
+
+STT_BACKENDS: dict[str, type[STTBackend]] = {
+    WhisperBackend.name: WhisperBackend,
+    HFWhisperBackend.name: HFWhisperBackend,
+    CTranslate2Backend.name: CTranslate2Backend,
+}
+
+
+def stt_backend(name: str, **options) -> STTBackend:
+    """Backend instance for "whisper" / "hf" / "ct2"."""
+    backend = STT_BACKENDS.get(name.lower())
+    if backend is None:
+        raise IllegalModelSelectionException(
+            f"Model type {name} is invalid. Choose one of: {', '.join(STT_BACKENDS)}."
+        )
+    return backend(**options)
+
+
 #   STT MAIN CLASS
 class STT:
-    def __init__(self, lang: str, model: str, audio_file_name: str):
+    def __init__(
+        self,
+        lang: str,
+        model: str,
+        audio_file_name: str,
+        preprocessor: AudioPreprocessor | None = None,
+        long_form: LongFormConfig | None = None,
+        decode_profile: DecodeProfile | None = None,
+    ):
         """
-        model = "whisper" OR "hf"
+        model = "whisper", "hf" or "ct2" (see STT_BACKENDS)
+        long_form = None keeps every clip on the single-pass path
+        decode_profile = None uses DECODE_PROFILES["balanced"]
         """
         self.lang = lang.lower()
         self.model = model.lower()
         self.audio_file_name = audio_file_name
+        self.preprocessor = preprocessor or AudioPreprocessor()
+        self.long_form = long_form
+        self.decode_profile = decode_profile or DECODE_PROFILES["balanced"]
         self.transcription_list: list[str] = []
         self.new_student: bool = True
 
      
     #   PREPROCESS     
-    def audio_preprocess(self) -> str:
+    def audio_preprocess(self) -> np.ndarray:
         """
-        Run audio preprocessing and return processed file path.
+        Run audio preprocessing and return the decoded 16 kHz float32 samples.
+        Decoding happens in memory, no intermediate WAV is written.
         """
-        preprocessor = AudioPreprocessor()
-        result = preprocessor.preprocess_file(self.audio_file_name)
-        return result.metadata.processed_path
+        result = self.preprocessor.preprocess_file(self.audio_file_name)
+        return result.audio
 
      
     #   LOCAL WHISPER TRANSCRIBE     
@@ -40,9 +347,14 @@ class STT:
         """
         try:
             whisper_model = SpeechModelGenerator.whisper_model_generator()
-            audio_path = self.audio_preprocess()
+            audio = self.audio_preprocess()
 
-            output = whisper_model.transcribe(audio_path, language=self.lang)
+            output = whisper_model.transcribe(
+                audio,
+                language=self.lang,
+                fp16=whisper_model.device.type == "cuda",
+                **self.decode_profile.transcribe_options(),
+            )
             if isinstance(output, dict) and "text" in output:
                 return output["text"]
 
@@ -57,26 +369,15 @@ class STT:
     def hf_transcribe(self) -> str:
         try:
             pipeline_model = SpeechModelGenerator.hf_model_generator()
-            audio_path = self.audio_preprocess()
-
-            result = pipeline_model(audio_path)
+            audio = self.audio_preprocess()
 
-            # Handle: [{"text": "..."}]
-            if isinstance(result, list) and result and isinstance(result[0], dict):
-                return result[0].get("text", "")
+            result = pipeline_model(audio)
 
-            # Handle: {"text": "..."}
-            if isinstance(result, dict):
-                return result.get("text", "")
-
-            # Handle generators
-            if hasattr(result, "__iter__") and not isinstance(result, (dict, list, str)):
-                items = list(result)
-                if items and isinstance(items[0], dict):
-                    return items[0].get("text", "")
-
-            print("Unexpected HF pipeline output:", result)
-            return ""
+            text = _hf_text(result)
+            if text is None:
+                print("Unexpected HF pipeline output:", result)
+                return ""
+            return text
 
         except Exception as e:
             print("Error while accessing HF Whisper:", e)
@@ -85,15 +386,9 @@ class STT:
      
     #   SELECTOR     
     def model_selector(self) -> str:
-        match self.model:
-            case "whisper":
-                return self.whisper_transcribe()
-            case "hf":
-                return self.hf_transcribe()
-            case _:
-                raise IllegalModelSelectionException(
-                    f"Model type {self.model} is invalid. Choose 'whisper' or 'hf'."
-                )
+        backend = stt_backend(self.model)
+        result = self.preprocessor.preprocess_file(self.audio_file_name)
+        return backend.run(self, result)
 
      
     #   PUBLIC API     
@@ -115,12 +410,29 @@ class STT:
         """
         Uses a preloaded whisper model (from FastAPI startup)
         → NO reloading
-        → FAST response
+        → audio is decoded, VAD-trimmed and chunked ONCE by AudioPreprocessor
+        → Whisper gets float32 samples, so it never spawns its own ffmpeg
+        """
+        result = self.preprocessor.preprocess_file(audio_file_path)
+        return self.transcribe_preprocessed(whisper_model, result, lang=lang)
+
+    def transcribe_preprocessed(self, whisper_model, result: PreprocessResult, lang=None) -> str:
+        """
+        Transcribe an already preprocessed clip with a preloaded whisper model.
         """
         try:
             lang = lang or self.lang
 
-            output = whisper_model.transcribe(audio_file_path, language=lang)
+            if self.is_long_form(result):
+                return self.transcribe_long_form(whisper_model, result, lang=lang)
+
+            # fp16 is CUDA-only; asking for it on CPU just logs a warning per call
+            output = whisper_model.transcribe(
+                result.audio,
+                language=lang,
+                fp16=whisper_model.device.type == "cuda",
+                **self.decode_profile.transcribe_options(),
+            )
 
             if isinstance(output, dict) and "text" in output:
                 return output["text"]
@@ -130,3 +442,204 @@ class STT:
         except Exception as e:
             print("Whisper transcription failed:", e)
             return ""
+
+    #   HF WHISPER WITH PRE-LOADED PIPELINE
+    def transcribe_preprocessed_hf(
+        self,
+        pipeline_model,
+        result: PreprocessResult,
+        lang=None,
+        chunk_length_s: float = 30.0,
+        batch_size: int = 8,
+    ) -> str:
+        """
+        Run the HF ASR pipeline on preprocessed samples using transformers'
+        chunked long-form inference: the clip is cut into chunk_length_s
+        windows with stride and batch_size of them go through generate at once.
+        Falls back to the lazily loaded pipeline when none was preloaded.
+        """
+        try:
+            pipeline_model = pipeline_model or SpeechModelGenerator.hf_model_generator()
+            lang = lang or self.lang
+
+            output = pipeline_model(
+                {"raw": result.audio, "sampling_rate": result.sample_rate},
+                chunk_length_s=chunk_length_s,
+                batch_size=batch_size,
+                generate_kwargs={
+                    "language": lang,
+                    "task": "transcribe",
+                    "num_beams": self.decode_profile.beam_size or 1,
+                },
+            )
+
+            text = _hf_text(output)
+            if text is None:
+                print("Unexpected HF pipeline output:", output)
+                return ""
+            return text.strip()
+
+        except Exception as e:
+            print("HF Whisper transcription failed:", e)
+            return ""
+
+    #   LANGUAGE DETECTION
+    def first_window(self, result: PreprocessResult) -> np.ndarray | None:
+        """First <= 30 s of the (VAD-trimmed) clip, or None if it is empty."""
+        window = result.audio[: int(WHISPER_WINDOW_SEC * result.sample_rate)]
+        return window if window.size else None
+
+    def detect_language(self, whisper_model, result: PreprocessResult) -> str:
+        """
+        Whisper language ID on the first voiced window only. The caller pins
+        the answer for the rest of the clip (and the session), so detection
+        never runs per chunk.
+        """
+        window = self.first_window(result)
+        if window is None or not whisper_model.is_multilingual:
+            return DEFAULT_LANGUAGE
+
+        mel = whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(window.astype(np.float32, copy=False)),
+            n_mels=whisper_model.dims.n_mels,
+        ).to(whisper_model.device)
+        _, probs = whisper_model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+    def is_long_form(self, result: PreprocessResult) -> bool:
+        """True when transcribe_preprocessed will use the batched window path."""
+        return (
+            self.long_form is not None
+            and result.metadata.duration_sec >= self.long_form.min_duration_sec
+        )
+
+    #   LONG-FORM (BATCHED) TRANSCRIBE
+    def transcribe_long_form(self, whisper_model, result: PreprocessResult, lang=None) -> str:
+        """
+        Split PreprocessResult.chunks into 30 s windows, decode them as
+        batches of padded mel spectrograms and stitch the texts in order.
+
+        The decoder itself runs on the calling thread: whisper installs
+        kv-cache hooks on the shared model for every decode, so concurrent
+        decodes on one model would corrupt each other. The mel frontend is
+        what runs on the worker pool, ahead of the decoder.
+        """
+        config = self.long_form or LongFormConfig()
+        lang = lang or self.lang
+
+        windows = self._windows_of(result, config)
+        if not windows:
+            return ""
+
+        texts = self.decode_windows(whisper_model, windows, lang, config, self.decode_profile)
+        return merge_overlapping_texts(texts, config.max_overlap_words)
+
+    #   MULTI-FILE (BATCHED) TRANSCRIBE
+    def transcribe_batch(
+        self,
+        whisper_model,
+        results: list[PreprocessResult],
+        lang=None,
+        on_result: Callable[[int, str], None] | None = None,
+    ) -> list[str]:
+        """
+        Decode the windows of several clips together so small clips share
+        padded mel batches. on_result(index, text) fires as soon as the last
+        window of a clip is decoded, before the rest of the batch finishes.
+        """
+        config = self.long_form or LongFormConfig()
+        lang = lang or self.lang
+
+        per_clip = [self._windows_of(result, config) for result in results]
+        texts: list[str] = [""] * len(results)
+
+        # clips with nothing to decode are done immediately
+        pending = [i for i, windows in enumerate(per_clip) if windows]
+        for i, windows in enumerate(per_clip):
+            if not windows and on_result is not None:
+                on_result(i, "")
+
+        flat = [window for i in pending for window in per_clip[i]]
+        decoded = self.iter_decoded_windows(whisper_model, flat, lang, config, self.decode_profile)
+
+        for i in pending:
+            clip_texts = [next(decoded) for _ in per_clip[i]]
+            texts[i] = merge_overlapping_texts(clip_texts, config.max_overlap_words)
+            if on_result is not None:
+                on_result(i, texts[i])
+
+        return texts
+
+    def _windows_of(self, result: PreprocessResult, config: LongFormConfig) -> list[np.ndarray]:
+        """PreprocessResult.chunks re-split so that no window exceeds 30 s."""
+        return [
+            window.audio
+            for chunk in result.chunks
+            for window in AudioPreprocessor._chunk_audio(
+                chunk.audio,
+                result.sample_rate,
+                WHISPER_WINDOW_SEC,
+                config.window_overlap_sec,
+                self.preprocessor.config.chunk_search_window_sec,
+            )
+            if window.audio.size
+        ]
+
+    @staticmethod
+    def decode_windows(
+        whisper_model,
+        windows: list[np.ndarray],
+        lang,
+        config: LongFormConfig,
+        profile: DecodeProfile | None = None,
+    ) -> list[str]:
+        """Batched whisper.decode over <= 30 s windows, results in input order."""
+        return list(STT.iter_decoded_windows(whisper_model, windows, lang, config, profile))
+
+    @staticmethod
+    def iter_decoded_windows(
+        whisper_model,
+        windows: list[np.ndarray],
+        lang,
+        config: LongFormConfig,
+        profile: DecodeProfile | None = None,
+    ) -> Iterator[str]:
+        """
+        Yield window texts in input order as each mel batch is decoded.
+        Windows are independent, so of the profile only beam size and the
+        first temperature apply (no fallback, no conditioning on earlier text).
+        """
+        profile = profile or DECODE_PROFILES["balanced"]
+        n_mels = whisper_model.dims.n_mels
+        device = whisper_model.device
+        options = whisper.DecodingOptions(
+            language=lang,
+            temperature=profile.temperature[0],
+            beam_size=profile.beam_size,
+            without_timestamps=True,
+            fp16=device.type == "cuda",
+        )
+
+        def mel_of(window: np.ndarray) -> torch.Tensor:
+            return whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(window.astype(np.float32, copy=False)), n_mels=n_mels
+            )
+
+        batch_size = max(1, config.batch_size)
+
+        with ThreadPoolExecutor(max_workers=max(1, config.mel_workers)) as pool:
+            mels = pool.map(mel_of, windows)
+            batch: list[torch.Tensor] = []
+            for mel in mels:
+                batch.append(mel)
+                if len(batch) == batch_size:
+                    yield from STT._decode_mel_batch(whisper_model, batch, options, device)
+                    batch = []
+            if batch:
+                yield from STT._decode_mel_batch(whisper_model, batch, options, device)
+
+    @staticmethod
+    def _decode_mel_batch(whisper_model, batch, options, device) -> list[str]:
+        mel = torch.stack(batch).to(device)
+        results = whisper.decode(whisper_model, mel, options)
+        return [r.text.strip() for r in results]
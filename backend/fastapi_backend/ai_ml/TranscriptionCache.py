@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+def pcm_digest(audio: np.ndarray) -> str:
+    """Content hash of decoded float32 samples."""
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return hashlib.blake2b(memoryview(samples).cast("B"), digest_size=20).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Transcripts keyed by the decoded PCM plus everything that changes the
+    decoder output (model, language, decode options).
+
+    Two layers: an in-memory LRU bounded by entry count and an optional
+    SQLite file bounded by total text size (least recently used rows are
+    evicted first). Safe to share between threads; with the SQLite layer
+    get/put do file I/O, so async callers should run them off the event
+    loop (see `persistent`).
+    """
+
+    # disk hits refresh last_access in batches of this many rows
+    TOUCH_BATCH = 64
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        db_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.db_max_bytes = db_max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        # running SUM(size) of the table, so inserts never scan it
+        self._disk_bytes = 0
+        # key -> last_access of disk hits not yet written back
+        self._touched = {}
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL,"
+                " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS transcripts_last_access ON transcripts(last_access)"
+            )
+            self._db.commit()
+            (self._disk_bytes,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    @staticmethod
+    def make_key(
+        digest: str,
+        sample_rate: int,
+        model_name: str,
+        lang: Optional[str],
+        options: Optional[dict] = None,
+    ) -> str:
+        payload = json.dumps(
+            [digest, sample_rate, model_name, lang, options or {}],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return text
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT text FROM transcripts WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._touched[key] = time.time()
+                    if len(self._touched) >= self.TOUCH_BATCH:
+                        self._flush_touched()
+                        self._db.commit()
+                    self._remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        if not text:
+            return
+
+        with self._lock:
+            self._remember(key, text)
+
+            if self._db is not None:
+                size = len(text.encode("utf-8"))
+                old = self._db.execute(
+                    "SELECT size FROM transcripts WHERE key = ?", (key,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, text, size, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time()),
+                )
+                self._touched.pop(key, None)
+                self._disk_bytes += size - (old[0] if old else 0)
+                self._evict_disk()
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            stats = {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+            if self._db is not None:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM transcripts").fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = self._disk_bytes
+            return stats
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        self._db.executemany(
+            "UPDATE transcripts SET last_access = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.db_max_bytes:
+            return
+
+        # recent hits must count before picking the least recently used rows
+        self._flush_touched()
+        while self._disk_bytes > self.db_max_bytes:
+            # oldest rows a page at a time (index on last_access), not the whole table
+            rows = self._db.execute(
+                "SELECT key, size FROM transcripts ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            for key, size in rows:
+                if self._disk_bytes <= self.db_max_bytes:
+                    break
+                self._db.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+                self._disk_bytes -= size
@@ -1,10 +1,60 @@
 # config.py
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
 
     HF_EVAL_MODEL_NAME: str = "microsoft/Phi-3.5-mini-instruct"
+    LLM_BATCH_MAX_SIZE: int = 8            # prompts per batched generate call
+    LLM_BATCH_MAX_WAIT_MS: float = 20.0    # how long the first prompt waits for company
+    LLM_MAX_NEW_TOKENS_CAP: int = 4096     # upper bound for the per-request token budgets
+    LLM_CONSTRAINED_DECODING: bool = False # JSON engines decode under their schema (needs lm-format-enforcer)
     STT_DEFAULT_MODEL: str = "whisper"
+    STT_WHISPER_MODEL_SIZE: str = "base"
+    STT_WHISPER_ALLOWED_SIZES: List[str] = ["tiny", "base", "small", "medium"]
+    STT_WHISPER_RAM_BUDGET_MB: int = 4096
+    STT_WHISPER_INT8: bool = False  # dynamic int8 linear layers, CPU only
+    STT_DECODE_PROFILE: str = "balanced"   # fast | balanced | accurate
+    STT_HF_MODEL_NAME: str = "openai/whisper-large-v3"
+    STT_PRELOAD_HF: bool = False
+    STT_HF_CHUNK_LENGTH_S: float = 30.0
+    STT_HF_BATCH_SIZE: int = 8
+    STT_CT2_MODEL_SIZE: str = "base"       # model=ct2, needs faster-whisper
+    STT_CT2_COMPUTE_TYPE: str = "int8"
+    STT_CT2_CPU_THREADS: int = 0           # 0 = CTranslate2 default
+    STT_PRELOAD_CT2: bool = False
+    STT_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    STT_UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    STT_BATCH_MAX_FILES: int = 50
+    STT_PREPROCESS_WORKERS: int = 0        # 0 = os.cpu_count()
+    STT_PREPROCESS_MAX_PENDING: int = 0    # 0 = 4 x workers
+    STT_INFERENCE_MAX_PENDING: int = 32
+    EXAM_EVAL_WORKERS: int = 8             # threads only wait on the LLM batcher
+    EXAM_EVAL_MAX_PENDING: int = 32
+    STT_CACHE_ENABLED: bool = True
+    STT_CACHE_MAX_ENTRIES: int = 1024
+    STT_CACHE_DB_PATH: Optional[str] = None    # e.g. "cache/transcripts.sqlite3"
+    STT_CACHE_DB_MAX_BYTES: int = 256 * 1024 * 1024
+    STT_LANG_SESSION_MAX_ENTRIES: int = 10000   # lang=auto results pinned per session_id
+    STT_STREAM_ENDPOINT_MS: int = 600
+    STT_STREAM_DECODE_PROFILE: str = "fast"
+    STT_STREAM_PARTIAL_INTERVAL_MS: int = 1000
+    STT_STREAM_MAX_UTTERANCE_SEC: float = 30.0
+    STT_VAD_ENABLED: bool = True
+    STT_DENOISE_ENABLED: bool = False      # spectral gating before VAD (noisereduce)
+    STT_IN_MEMORY_DECODE: bool = True
+    STT_DIRECT_READ: bool = True           # WAV/FLAC/AIFF skip ffmpeg
+    STT_CHUNK_DURATION_SEC: float = 30.0
+    STT_CHUNK_OVERLAP_SEC: float = 1.0
+    STT_CHUNK_SEARCH_SEC: float = 2.0
+    STT_LONG_FORM_ENABLED: bool = True
+    STT_LONG_FORM_MIN_SEC: float = 60.0
+    STT_LONG_FORM_BATCH_SIZE: int = 8
+    STT_LONG_FORM_MEL_WORKERS: int = 2
+    STT_WARMUP_ENABLED: bool = True
+    STT_WARMUP_SEC: float = 5.0
+    STT_WARMUP_RUNS: int = 1
     MCQ_EVAL_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
 
     class Config:
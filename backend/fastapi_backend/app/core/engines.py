@@ -0,0 +1,22 @@
+from app.core import models
+
+
+class SharedEngine:
+    """
+    One LLM engine per process, bound to models.ai_model. Engines build their
+    prompt chain on first use, so sharing the instance keeps that work out of
+    the request path. The engine is rebuilt only if the lifespan model is
+    replaced; while models.ai_model is unset it keeps whatever model the
+    engine loaded for itself.
+    """
+
+    def __init__(self, engine_cls, **kwargs):
+        self.engine_cls = engine_cls
+        self.kwargs = kwargs
+        self._engine = None
+
+    def get(self):
+        engine = self._engine
+        if engine is None or (models.ai_model is not None and engine.model is not models.ai_model):
+            engine = self._engine = self.engine_cls(global_model=models.ai_model, **self.kwargs)
+        return engine
@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+class BoundedExecutor:
+    """
+    Executor wrapper with a cap on queued + running jobs. Once the cap is
+    reached new work is refused with 503 instead of piling up behind it.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int, name: str, workers: int = 1):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.workers = workers
+        self.name = name
+        # only touched from the event loop thread
+        self.pending = 0
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy: {self.name} queue is full, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(partial(fn, *args, **kwargs))
+        self.pending += 1
+        # released when the job itself finishes, not when this coroutine
+        # does: a cancelled caller leaves the job running in the pool
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release(self):
+        self.pending -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# set by start_executors() during lifespan
+preprocess_pool: BoundedExecutor | None = None
+inference_pool: BoundedExecutor | None = None
+evaluation_pool: BoundedExecutor | None = None
+
+
+def start_executors():
+    global preprocess_pool, inference_pool, evaluation_pool
+
+    workers = settings.STT_PREPROCESS_WORKERS or os.cpu_count() or 1
+
+    # spawn: workers only need numpy/webrtcvad/ffmpeg, never the parent's torch state
+    preprocess_pool = BoundedExecutor(
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")),
+        max_pending=settings.STT_PREPROCESS_MAX_PENDING or 4 * workers,
+        name="preprocess",
+        workers=workers,
+    )
+
+    # one thread: the shared whisper model must not decode concurrently
+    inference_pool = BoundedExecutor(
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-inference"),
+        max_pending=settings.STT_INFERENCE_MAX_PENDING,
+        name="inference",
+    )
+
+    # LLM grading for /exam/answer: a separate stage, so one answer's
+    # evaluation overlaps with the next answer's transcription
+    evaluation_pool = BoundedExecutor(
+        ThreadPoolExecutor(max_workers=settings.EXAM_EVAL_WORKERS, thread_name_prefix="evaluation"),
+        max_pending=settings.EXAM_EVAL_MAX_PENDING,
+        name="evaluation",
+        workers=settings.EXAM_EVAL_WORKERS,
+    )
+
+
+def shutdown_executors():
+    for pool in (preprocess_pool, inference_pool, evaluation_pool):
+        if pool is not None:
+            pool.shutdown()
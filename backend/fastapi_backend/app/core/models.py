@@ -1,3 +1,5 @@
 whisper_model = None
+hf_stt_model = None
+ct2_stt_model = None
 ai_model = None
 st_model = None
@@ -0,0 +1,115 @@
+import os
+import shutil
+import zipfile
+from contextlib import AsyncExitStack, asynccontextmanager
+from tempfile import mkdtemp
+from typing import List, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+
+@asynccontextmanager
+async def staged_upload(upload: UploadFile, max_bytes: int, chunk_bytes: int = 1 << 20):
+    """
+    Copy an upload into a private temp directory in fixed-size chunks and
+    yield the file path. Uploads larger than max_bytes are rejected with 413
+    as soon as the limit is crossed, without reading the rest.
+
+    Everything created inside the directory (the upload itself, legacy
+    "<name>_16k.wav" files written next to it) is removed on exit.
+    """
+    size = getattr(upload, "size", None)
+    if size is not None and size > max_bytes:
+        raise HTTPException(413, f"Upload exceeds the {max_bytes} byte limit")
+
+    workdir = mkdtemp(prefix="upload_")
+    try:
+        suffix = os.path.splitext(upload.filename or "")[-1] or ".wav"
+        path = os.path.join(workdir, "audio" + suffix)
+
+        written = 0
+        with open(path, "wb") as out:
+            while True:
+                block = await upload.read(chunk_bytes)
+                if not block:
+                    break
+                written += len(block)
+                if written > max_bytes:
+                    raise HTTPException(413, f"Upload exceeds the {max_bytes} byte limit")
+                out.write(block)
+
+        if written == 0:
+            raise HTTPException(400, "Uploaded audio file is empty")
+
+        yield path
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+def is_zip_upload(upload: UploadFile) -> bool:
+    return (
+        upload.content_type in ZIP_CONTENT_TYPES
+        or (upload.filename or "").lower().endswith(".zip")
+    )
+
+
+def extract_zip_members(zip_path: str, max_bytes: int, max_files: int) -> List[Tuple[str, str]]:
+    """
+    Unpack the audio members of a staged zip next to it and return
+    (member name, path) pairs in archive order. Member names are never used
+    as paths; every member is size-checked before it is extracted.
+    """
+    workdir = os.path.dirname(zip_path)
+    staged = []
+
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile:
+        raise HTTPException(400, "Uploaded zip archive is corrupt")
+
+    with archive:
+        members = [m for m in archive.infolist() if not m.is_dir()]
+        if len(members) > max_files:
+            raise HTTPException(413, f"Zip contains more than {max_files} files")
+
+        for index, member in enumerate(members):
+            if member.file_size > max_bytes:
+                raise HTTPException(413, f"'{member.filename}' exceeds the {max_bytes} byte limit")
+
+            suffix = os.path.splitext(member.filename)[-1] or ".wav"
+            path = os.path.join(workdir, f"member_{index}{suffix}")
+            with archive.open(member) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            staged.append((member.filename, path))
+
+    return staged
+
+
+async def stage_batch(
+    stack: AsyncExitStack,
+    uploads: List[UploadFile],
+    max_bytes: int,
+    max_files: int,
+    chunk_bytes: int = 1 << 20,
+) -> List[Tuple[str, str]]:
+    """
+    Stage several uploads (zip archives are expanded) and return
+    (file name, path) pairs. Cleanup of every temp directory is registered
+    on `stack`, so the caller decides how long the files live.
+    """
+    staged = []
+    for upload in uploads:
+        path = await stack.enter_async_context(staged_upload(upload, max_bytes, chunk_bytes))
+        if is_zip_upload(upload):
+            staged.extend(extract_zip_members(path, max_bytes, max_files - len(staged)))
+        else:
+            staged.append((upload.filename or f"file_{len(staged)}", path))
+
+        if len(staged) > max_files:
+            raise HTTPException(413, f"Batch contains more than {max_files} files")
+
+    return staged
@@ -1,11 +1,17 @@
+import asyncio
+
 from fastapi import FastAPI
-from app.routers import stt, evaluation, tts, question_generation, rubrics, mcq_evaluation, mcq_generation
+from fastapi.responses import JSONResponse
+from app.routers import stt, evaluation, exam, tts, question_generation, rubrics, mcq_evaluation, mcq_generation
 from contextlib import asynccontextmanager
 
 from ai_ml.ModelCreator import HFModelCreation
+from ai_ml.LLMBatcher import GenerationBatcher
 from ai_ml.Speech2Text import SpeechModelGenerator
 from ai_ml.MCQEvaluation import MCQEvaluationEngine
 from app.core import models
+from app.core.executors import start_executors, shutdown_executors
+from app.services import warmup_service
 
 from app.config import settings
 
@@ -14,28 +20,78 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # preload whisper model
+    # process pool for audio preprocessing + single inference thread
+    start_executors()
+
+    # preload the default whisper size; other sizes load on demand within the RAM budget
+    SpeechModelGenerator.whisper_model_name = settings.STT_WHISPER_MODEL_SIZE
+    SpeechModelGenerator.whisper_registry.allowed = settings.STT_WHISPER_ALLOWED_SIZES
+    SpeechModelGenerator.whisper_registry.budget_bytes = settings.STT_WHISPER_RAM_BUDGET_MB * 1024 * 1024
+    SpeechModelGenerator.whisper_registry.quantize_int8 = settings.STT_WHISPER_INT8
     models.whisper_model = SpeechModelGenerator.whisper_model_generator()
 
+    # preload HF Whisper pipeline only when configured (large download / RAM)
+    SpeechModelGenerator.hf_model_name = settings.STT_HF_MODEL_NAME
+    if settings.STT_PRELOAD_HF or settings.STT_DEFAULT_MODEL.lower() == "hf":
+        models.hf_stt_model = SpeechModelGenerator.hf_model_generator()
+
+    # preload the CTranslate2 backend the same way
+    SpeechModelGenerator.ct2_model_name = settings.STT_CT2_MODEL_SIZE
+    SpeechModelGenerator.ct2_compute_type = settings.STT_CT2_COMPUTE_TYPE
+    SpeechModelGenerator.ct2_cpu_threads = settings.STT_CT2_CPU_THREADS
+    if settings.STT_PRELOAD_CT2 or settings.STT_DEFAULT_MODEL.lower() == "ct2":
+        models.ct2_stt_model = SpeechModelGenerator.ct2_model_generator()
+
     # preload AI model ONCE - shared across all services
-    models.ai_model = HFModelCreation.hf_model_creator(settings.HF_EVAL_MODEL_NAME)
+    # concurrent prompts from all four LLM engines are batched into shared generate calls
+    models.ai_model = HFModelCreation.hf_model_creator(
+        settings.HF_EVAL_MODEL_NAME,
+        max_batch_size=settings.LLM_BATCH_MAX_SIZE,
+        max_wait_ms=settings.LLM_BATCH_MAX_WAIT_MS,
+        max_new_tokens_cap=settings.LLM_MAX_NEW_TOKENS_CAP,
+    )
+    if settings.LLM_CONSTRAINED_DECODING and not GenerationBatcher.supports_json_schema():
+        print("LLM_CONSTRAINED_DECODING is set but lm-format-enforcer is not installed; using format instructions")
 
     # preload Sentence Transformers model for similarity score
     models.st_model = MCQEvaluationEngine(settings.MCQ_EVAL_MODEL_NAME)
 
+    # warm every preloaded STT model in the background; /ready says "warming" until done
+    warmup = None
+    if settings.STT_WARMUP_ENABLED:
+        warmup = asyncio.create_task(warmup_service.run_warmup())
+    else:
+        warmup_service.status["state"] = "ready"
+
     yield
 
+    if warmup is not None:
+        warmup.cancel()
+    shutdown_executors()
+
 app = FastAPI(title="Examecho AI Service", lifespan=lifespan)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    status = warmup_service.status
+    return JSONResponse(status, status_code=200 if status["state"] == "ready" else 503)
+
+@app.get("/llm/stats")
+def llm_stats():
+    """Batching and per-task token counts of the shared LLM."""
+    batcher = getattr(models.ai_model, "batcher", None)
+    return batcher.stats() if batcher is not None else {"enabled": False}
+
 app.include_router(mcq_generation.router)
 app.include_router(question_generation.router)
 app.include_router(rubrics.router)
 app.include_router(tts.router)
 app.include_router(stt.router)
 app.include_router(evaluation.router)
+app.include_router(exam.router)
 app.include_router(mcq_evaluation.router)
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from app.schemas.evaluation import EvaluateAnswer, EvaluateAnswerResponse
 from app.services.evaluation_service import evaluator_service
 
@@ -6,4 +7,4 @@ router = APIRouter(prefix="/evaluate", tags=["Evaluation"])
 
 @router.post("/answer", response_model=EvaluateAnswerResponse)
 async def eval_route(payload: EvaluateAnswer):
-    return evaluator_service.evaluate(payload)
+    return await run_in_threadpool(evaluator_service.evaluate, payload)
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.routers.stt import ALLOWED
+from app.schemas.evaluation import QuestionContext
+from app.schemas.exam import ExamAnswerResponse
+from app.services.exam_service import answer
+
+router = APIRouter(prefix="/exam", tags=["Exam"])
+
+
+@router.post("/answer", response_model=ExamAnswerResponse)
+async def exam_answer_route(
+    audio: UploadFile = File(...),
+    question_id: str = Form(...),
+    question_text: str = Form(...),
+    rubric: List[str] = Form(...),
+    max_marks: float = Form(10),
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """Transcribe a spoken answer and evaluate it against the rubric."""
+    if audio.content_type not in ALLOWED:
+        raise HTTPException(400, f"Invalid audio type: {audio.content_type}")
+
+    # reject bad metadata before any audio work is done
+    try:
+        question = QuestionContext(
+            question_id=question_id,
+            question_text=question_text,
+            rubric=rubric,
+            max_marks=max_marks,
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    return await answer(audio, question, lang, model, session_id, profile)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.schemas.mcq_generation import (
     MCQGenerationRequest,
     MCQGenerationResponse
@@ -14,7 +15,7 @@ router = APIRouter(
 
 @router.post("/generate", response_model=MCQGenerationResponse)
 async def generate_mcqs(payload: MCQGenerationRequest):
-    response = generation_service.generate_mcqs_service(payload)
+    response = await run_in_threadpool(generation_service.generate_mcqs_service, payload)
 
     if not response:
         raise HTTPException(
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.schemas.question_generation import QuestionGenerationRequest, QuestionGenerationResponse
 from app.services.question_generation_service import generation_service
 
@@ -9,7 +10,7 @@ router = APIRouter(
 
 @router.post("/generate", response_model= QuestionGenerationResponse)
 async def generate_route(payload: QuestionGenerationRequest):
-    questions = generation_service.generate(payload)
+    questions = await run_in_threadpool(generation_service.generate, payload)
 
     if not questions:
         raise HTTPException(
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.schemas.rubrics import RubricsRequest, RubricsResponse
 from app.services.rubrics_service import generate_rubrics_service
 
@@ -10,7 +11,7 @@ router = APIRouter(
 @router.post("/create", response_model= RubricsResponse)
 async def generate_rubrics(payload: RubricsRequest):
     
-    rubrics = generate_rubrics_service.generate(payload)
+    rubrics = await run_in_threadpool(generate_rubrics_service.generate, payload)
 
     if not rubrics:
         raise HTTPException(
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.schemas.stt import STTResponse
-from app.services.stt_service import transcribe
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
+from app.schemas.stt import STTResponse, STTBatchResponse
+from app.services.stt_service import transcribe, transcribe_batch, open_batch, cache_stats, model_stats
+from app.services.stt_stream_service import LiveTranscriptionSession
+from app.core.uploads import ZIP_CONTENT_TYPES
 
 router = APIRouter(prefix="/stt", tags=["Speech-To-Text"])
 
@@ -10,9 +16,77 @@ ALLOWED = {
 }
 
 @router.post("/transcribe", response_model=STTResponse)
-async def stt_route(audio: UploadFile = File(...), lang="en", model=None):
+async def stt_route(
+    audio: UploadFile = File(...),
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+):
     if audio.content_type not in ALLOWED:
         raise HTTPException(400, f"Invalid audio type: {audio.content_type}")
 
-    text = await transcribe(audio, lang, model)
-    return STTResponse(text=text, language=lang, model=model)
+    # lang="auto": detected once, then pinned for the session_id
+    text, language, timings = await transcribe(audio, lang, model, session_id, profile)
+    return STTResponse(text=text, language=language, model=model, timings=timings)
+
+
+def _check_batch_types(files: List[UploadFile]):
+    for f in files:
+        if f.content_type not in ALLOWED | ZIP_CONTENT_TYPES:
+            raise HTTPException(400, f"Invalid audio type for '{f.filename}': {f.content_type}")
+
+
+@router.post("/transcribe_batch", response_model=STTBatchResponse)
+async def stt_batch_route(
+    files: List[UploadFile] = File(...),
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    _check_batch_types(files)
+
+    results = await transcribe_batch(files, lang, model, session_id, profile)
+    language = next((item["language"] for item in results if item["language"]), lang)
+    return STTBatchResponse(language=language, model=model, results=results)
+
+
+@router.post("/transcribe_batch/stream")
+async def stt_batch_stream_route(
+    files: List[UploadFile] = File(...),
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """One JSON object per line, in completion order, as each file finishes."""
+    _check_batch_types(files)
+
+    items = await open_batch(files, lang, model, session_id, profile)
+
+    async def ndjson():
+        async for item in items:
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.websocket("/stream")
+async def stt_stream_route(
+    websocket: WebSocket, lang: str = "en", encoding: str = "pcm_s16le", session_id: Optional[str] = None
+):
+    """Live transcription; see LiveTranscriptionSession for the message protocol."""
+    await websocket.accept()
+    await LiveTranscriptionSession(websocket, lang=lang, encoding=encoding, session_id=session_id).run()
+
+
+@router.get("/cache/stats")
+def stt_cache_stats_route():
+    return cache_stats()
+
+
+@router.get("/models")
+async def stt_models_route():
+    """Loaded Whisper sizes, resident memory, load times and hit counts."""
+    return model_stats()
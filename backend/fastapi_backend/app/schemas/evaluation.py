@@ -1,7 +1,7 @@
 from typing import Optional, Dict, Any, Annotated,List
 from pydantic import BaseModel, Field, StringConstraints
 
-class EvaluateAnswer(BaseModel):
+class QuestionContext(BaseModel):
     # Use StringConstraints for whitespace stripping and length checks
     question_id: Annotated[str, 
                         StringConstraints(strip_whitespace=True, min_length=1)]
@@ -9,12 +9,15 @@ class EvaluateAnswer(BaseModel):
     question_text: Annotated[str,
                              StringConstraints(strip_whitespace=True, min_length=5, max_length=3000)]
     
-    student_answer: Annotated[str, 
-        StringConstraints(strip_whitespace=True, min_length=1, max_length=8000)
-    ]
     rubric: Annotated[List[str], 
                       StringConstraints(min_length=1)]
     max_marks: Annotated[float, Field(ge=1, le=100)] = 10
+
+
+class EvaluateAnswer(QuestionContext):
+    student_answer: Annotated[str, 
+        StringConstraints(strip_whitespace=True, min_length=1, max_length=8000)
+    ]
     
     # # Optional fields remain the same
     # reference_answer: Optional[str] = None
@@ -0,0 +1,11 @@
+# app/schemas/exam.py
+from typing import Dict, Optional
+
+from app.schemas.evaluation import EvaluateAnswerResponse
+
+
+class ExamAnswerResponse(EvaluateAnswerResponse):
+    transcript: str
+    language: Optional[str] = None
+    # seconds per stage: preprocess, inference, evaluation, total (+ preprocess.* details)
+    timings: Dict[str, float]
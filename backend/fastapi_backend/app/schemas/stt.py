@@ -1,8 +1,24 @@
 # app/schemas/stt.py
 from pydantic import BaseModel, constr,StringConstraints
-from typing import Optional,Annotated
+from typing import Optional,Annotated, Dict, List
 
 class STTResponse(BaseModel):
     text: Optional[str] = None
     language: Optional[str] = None
     model: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+
+
+class STTBatchItem(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    text: Optional[str] = None
+    error: Optional[str] = None
+    duration_sec: Optional[float] = None
+    language: Optional[str] = None
+
+
+class STTBatchResponse(BaseModel):
+    language: Optional[str] = None
+    model: Optional[str] = None
+    results: List[STTBatchItem]
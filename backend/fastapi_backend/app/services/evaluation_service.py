@@ -1,19 +1,24 @@
 from ai_ml.Evaluation import EvaluationEngine
 from app.schemas.evaluation import EvaluateAnswer
-from app.core import models   
+from app.core.engines import SharedEngine
 from app.config import settings
 
 model_name = settings.HF_EVAL_MODEL_NAME
 
 class EvaluationService:
 
+    def __init__(self):
+        self.engine = SharedEngine(
+            EvaluationEngine,
+            model_name=model_name,
+            constrained=settings.LLM_CONSTRAINED_DECODING,
+        )
+
     def evaluate(self, payload: EvaluateAnswer):
         data = payload.model_dump()
 
         try:
-            # use models.ai_model loaded during lifespan
-      
-            result = EvaluationEngine(model_name=model_name, global_model=models.ai_model).model_evaluator(data)
+            result = self.engine.get().model_evaluator(data)
 
             required_keys = ["score", "strengths", "weakness",
                              "justification", "suggested_improvement"]
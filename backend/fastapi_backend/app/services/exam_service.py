@@ -0,0 +1,41 @@
+import time
+
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+
+from app.core import executors
+from app.schemas.evaluation import EvaluateAnswer, QuestionContext
+from app.services.evaluation_service import evaluator_service
+from app.services.stt_service import transcribe
+
+
+async def answer(
+    audio: UploadFile,
+    question: QuestionContext,
+    lang="en",
+    model=None,
+    session_id=None,
+    profile=None,
+) -> dict:
+    """
+    Spoken answer -> transcript -> rubric evaluation in one request.
+
+    Each stage runs on its own executor (preprocess processes, the STT
+    inference thread, the evaluation thread), so while one answer is being
+    graded the next one is already being decoded and transcribed.
+    """
+    start = time.perf_counter()
+
+    text, language, timings = await transcribe(audio, lang, model, session_id, profile)
+
+    try:
+        payload = EvaluateAnswer(**question.model_dump(), student_answer=text)
+    except ValidationError as e:
+        raise HTTPException(422, f"Transcript cannot be evaluated: {e.errors()[0]['msg']}")
+
+    eval_start = time.perf_counter()
+    result = await executors.evaluation_pool.run(evaluator_service.evaluate, payload)
+    timings["evaluation"] = time.perf_counter() - eval_start
+    timings["total"] = time.perf_counter() - start
+
+    return {**result, "transcript": text, "language": language, "timings": timings}
@@ -3,13 +3,19 @@ from fastapi import HTTPException, status
 from app.schemas.mcq_generation import MCQGenerationRequest
 from ai_ml.MCQGenerator import MCQGenerator
 from ai_ml.AIExceptions import *
-from app.core import models
+from app.core.engines import SharedEngine
 from app.config import settings
 
 model_name = settings.HF_EVAL_MODEL_NAME
 
 class MCQGenerationService:
 
+    def __init__(self):
+        self.engine = SharedEngine(
+            MCQGenerator,
+            model_name=model_name,
+        )
+
     def generate_mcqs_service(self, input_request: MCQGenerationRequest):
 
         input_request = input_request.model_dump()
@@ -24,10 +30,7 @@ class MCQGenerationService:
                 )
 
         try:
-            generator = MCQGenerator(
-                model_name = model_name,
-                global_model = models.ai_model
-            )
+            generator = self.engine.get()
         except ModelLoadException as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,5 +1,5 @@
 from app.schemas.question_generation import QuestionGenerationRequest
-from app.core import models
+from app.core.engines import SharedEngine
 from ai_ml.QuestionsGenerator import QuestionsGenerator
 from app.config import settings
 from ai_ml.AIExceptions import *
@@ -10,18 +10,20 @@ model_name = settings.HF_EVAL_MODEL_NAME
 
 class QuestionGenerationService:
 
+    def __init__(self):
+        self.engine = SharedEngine(
+            QuestionsGenerator,
+            model_name=model_name,
+            constrained=settings.LLM_CONSTRAINED_DECODING,
+        )
+
     def generate(self, payload: QuestionGenerationRequest):
 
         data = payload.model_dump()
 
         try:
 
-            # Use models.ai_model loaded during lifespan
-
-            generator = QuestionsGenerator(
-                model_name=model_name, 
-                global_model=models.ai_model
-            )
+            generator = self.engine.get()
         
         except ModelLoadException as e:
             raise HTTPException(
@@ -1,5 +1,5 @@
 from app.schemas.rubrics import RubricsRequest
-from app.core import models
+from app.core.engines import SharedEngine
 from ai_ml.Rubrics import RubricsEngine
 from app.config import settings
 from fastapi import HTTPException
@@ -7,15 +7,20 @@ from fastapi import HTTPException
 model_name = settings.HF_EVAL_MODEL_NAME
 
 class RubricsService:
+    def __init__(self):
+        self.engine = SharedEngine(
+            RubricsEngine,
+            model_name=model_name,
+            constrained=settings.LLM_CONSTRAINED_DECODING,
+        )
+
     def generate(self, payload: RubricsRequest):
 
         data = payload.model_dump()
 
         try: 
             
-            # Use models.ai_model loaded during lifespan
-
-            result = RubricsEngine(model_name=model_name, global_model=models.ai_model).create_rubrics(data)
+            result = self.engine.get().create_rubrics(data)
 
             # Accept dict or pydantic model-like object
             if not result:
@@ -1,64 +1,465 @@
-import os
-from tempfile import NamedTemporaryFile
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import AsyncIterator, List, Optional, Tuple
+
 from fastapi import UploadFile, HTTPException
 
-from ai_ml.Speech2Text import STT
+from ai_ml.AIExceptions import AudioProcessingError, IllegalModelSelectionException
+from ai_ml.AudioPreprocessor import AudioPreprocessor, AudioPreprocessorConfig, PreprocessResult
+from ai_ml.ModelCreator import SpeechModelGenerator
+from ai_ml.Speech2Text import (
+    STT, CTranslate2Backend, DecodeProfile, HFWhisperBackend, LongFormConfig, STTBackend, WhisperBackend,
+    decode_profile,
+)
+from ai_ml.TranscriptionCache import TranscriptionCache
 from app.config import settings
-from app.core import models   
+from app.core import executors
+from app.core.uploads import stage_batch, staged_upload
+
+# shared across requests; decoding + VAD happen once per upload
+preprocessor = AudioPreprocessor(
+    AudioPreprocessorConfig(
+        vad_enabled=settings.STT_VAD_ENABLED,
+        denoise_enabled=settings.STT_DENOISE_ENABLED,
+        in_memory_decode=settings.STT_IN_MEMORY_DECODE,
+        direct_read=settings.STT_DIRECT_READ,
+        chunk_duration_sec=settings.STT_CHUNK_DURATION_SEC,
+        chunk_overlap_sec=settings.STT_CHUNK_OVERLAP_SEC,
+        chunk_search_window_sec=settings.STT_CHUNK_SEARCH_SEC,
+        compute_digest=settings.STT_CACHE_ENABLED,
+    )
+)
+
+long_form = LongFormConfig(
+    min_duration_sec=settings.STT_LONG_FORM_MIN_SEC,
+    batch_size=settings.STT_LONG_FORM_BATCH_SIZE,
+    mel_workers=settings.STT_LONG_FORM_MEL_WORKERS,
+) if settings.STT_LONG_FORM_ENABLED else None
+
+
+cache = TranscriptionCache(
+    max_entries=settings.STT_CACHE_MAX_ENTRIES,
+    db_path=settings.STT_CACHE_DB_PATH,
+    db_max_bytes=settings.STT_CACHE_DB_MAX_BYTES,
+) if settings.STT_CACHE_ENABLED else None
+
+
+class SessionLanguages:
+    """session_id -> detected language, LRU-bounded to max_entries."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._languages: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            lang = self._languages.get(session_id)
+            if lang is not None:
+                self._languages.move_to_end(session_id)
+            return lang
+
+    def put(self, session_id: str, lang: str):
+        with self._lock:
+            self._languages[session_id] = lang
+            self._languages.move_to_end(session_id)
+            while len(self._languages) > self.max_entries:
+                self._languages.popitem(last=False)
+
+
+# lang=auto: language detected for a session, so it is detected once per
+# student rather than per question
+session_languages = SessionLanguages(max_entries=settings.STT_LANG_SESSION_MAX_ENTRIES)
+
+
+def _cache_key(
+    result: PreprocessResult, lang, windowed: bool, model_name: str, profile: DecodeProfile
+) -> Optional[str]:
+    if cache is None or result.digest is None:
+        return None
+    return TranscriptionCache.make_key(
+        result.digest,
+        result.sample_rate,
+        model_name=model_name,
+        lang=lang,
+        options={
+            "windowed": windowed,
+            "profile": profile.name,
+            # preprocessing settings: a transcript cached under one chunking
+            # (or VAD/denoise) setup must not be served after it changes
+            "vad": preprocessor.config.vad_enabled,
+            "denoise": preprocessor.config.denoise_enabled,
+            "chunk": [
+                preprocessor.config.chunk_duration_sec,
+                preprocessor.config.chunk_overlap_sec,
+                preprocessor.config.chunk_search_window_sec,
+            ],
+        },
+    )
+
+
+async def _cache_get(key: Optional[str]) -> Optional[str]:
+    if not key:
+        return None
+    # the SQLite layer does file I/O; keep it off the event loop
+    if cache.persistent:
+        return await asyncio.to_thread(cache.get, key)
+    return cache.get(key)
+
+
+async def _cache_put(key: Optional[str], text: str):
+    if not key:
+        return
+    if cache.persistent:
+        await asyncio.to_thread(cache.put, key, text)
+    else:
+        cache.put(key, text)
+
+
+def model_stats() -> dict:
+    return SpeechModelGenerator.whisper_registry.stats()
+
 
+def cache_stats() -> dict:
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
 
-async def transcribe(audio: UploadFile, lang="en", model=None):
-    model = model or settings.STT_DEFAULT_MODEL  # usually "whisper"
 
-    suffix = os.path.splitext(audio.filename or "")[-1] or ".wav"
-    with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(await audio.read())
-        tmp_path = tmp.name
+def parse_model(model: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    "whisper" / "whisper-<size>" / "hf" / "ct2"  ->  (backend, whisper size).
+    Raises 400 for unknown backends or whisper sizes.
+    """
+    model = (model or settings.STT_DEFAULT_MODEL).lower()  # usually "whisper"
+    backend, _, size = model.partition("-")
 
-    stt = STT(lang=lang, model=model, audio_file_name=tmp_path)
+    if backend in ("hf", "ct2") and not size:
+        return backend, None
 
-    if model.lower() == "whisper":
+    if backend == "whisper":
+        size = size or SpeechModelGenerator.whisper_model_name
         try:
-            # fetch model from global module (updated by lifespan)
-            text = stt.transcribe_with_existing_model(
-                models.whisper_model,
-                audio_file_path=tmp_path,
-                lang=lang
-            )
+            SpeechModelGenerator.whisper_registry.validate(size)
+        except IllegalModelSelectionException as e:
+            raise HTTPException(400, str(e))
+        return "whisper", size
+
+    raise HTTPException(
+        status_code=400,
+        detail=f"Invalid STT model '{model}'. Choose 'whisper', 'whisper-<size>', 'hf' or 'ct2'."
+    )
+
+
+def _engine(backend: str, size: Optional[str]) -> STTBackend:
+    if backend == "whisper":
+        return WhisperBackend(size)
+    if backend == "hf":
+        return HFWhisperBackend(
+            chunk_length_s=settings.STT_HF_CHUNK_LENGTH_S,
+            batch_size=settings.STT_HF_BATCH_SIZE,
+        )
+    return CTranslate2Backend()
+
+
+def resolve_profile(name: Optional[str]) -> DecodeProfile:
+    """fast / balanced / accurate, defaulting to settings.STT_DECODE_PROFILE; 400 otherwise."""
+    try:
+        return decode_profile(name or settings.STT_DECODE_PROFILE)
+    except IllegalModelSelectionException as e:
+        raise HTTPException(400, str(e))
+
+
+async def _resolve_language(
+    engine: STTBackend,
+    stt: STT,
+    result: PreprocessResult,
+    lang,
+    session_id: Optional[str],
+    timings: dict,
+) -> str:
+    """
+    lang=auto -> language pinned for the session, or detected on the
+    clip's first voiced window (on the inference thread) and pinned.
+    """
+    if lang != "auto":
+        return lang
+
+    detected = session_languages.get(session_id) if session_id else None
+    if detected is None:
+        start = time.perf_counter()
+        try:
+            detected = await executors.inference_pool.run(engine.run_detect, stt, result)
+        except HTTPException:
+            raise
+        except IllegalModelSelectionException as e:
+            raise HTTPException(400, str(e))
         except Exception as e:
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
-            raise HTTPException(500, f"Whisper transcription failed: {str(e)}")
+            raise HTTPException(500, f"Language detection failed: {str(e)}")
+        timings["detect_language"] = time.perf_counter() - start
 
-    elif model.lower() == "hf":
-        stt.transcribe()
-        text = stt.transcription_list[0] if stt.transcription_list else ""
+        if session_id:
+            session_languages.put(session_id, detected)
 
-    else:
+    stt.lang = detected
+    return detected
+
+
+async def transcribe(
+    audio: UploadFile,
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """
+    Returns (text, language, timings); language is the detected one when
+    lang="auto".
+    """
+    backend, size = parse_model(model)
+    profile = resolve_profile(profile)
+    lang = (lang or "en").lower()
+
+    timings: dict[str, float] = {}
+
+    # upload + every derived temp file is removed when this block exits
+    async with staged_upload(
+        audio,
+        max_bytes=settings.STT_MAX_UPLOAD_BYTES,
+        chunk_bytes=settings.STT_UPLOAD_CHUNK_BYTES,
+    ) as tmp_path:
+
+        stt = STT(
+            lang=lang,
+            model=backend,
+            audio_file_name=tmp_path,
+            preprocessor=preprocessor,
+            long_form=long_form,
+            decode_profile=profile,
+        )
+
+        # decode + VAD + chunking on the process pool, off the event loop
+        start = time.perf_counter()
         try:
-            os.remove(tmp_path)
-        except:
-            pass
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid STT model '{model}'. Choose 'whisper' or 'hf'."
+            result = await executors.preprocess_pool.run(preprocessor.preprocess_file, tmp_path)
+        except AudioProcessingError as e:
+            raise HTTPException(400, f"Could not decode audio: {str(e)}")
+        timings["preprocess"] = time.perf_counter() - start
+        timings.update({f"preprocess.{k}": v for k, v in result.timings.items()})
+
+        # model lookup (and any lazy load) happens on the inference thread
+        engine = _engine(backend, size)
+        lang = await _resolve_language(engine, stt, result, lang, session_id, timings)
+        run = partial(engine.run, stt, result, lang)
+        key = _cache_key(
+            result,
+            lang,
+            windowed=stt.is_long_form(result) if backend == "whisper" else True,
+            model_name=engine.cache_name(),
+            profile=profile,
         )
 
+        # re-submitted recordings are answered without touching the model
+        text = await _cache_get(key)
+
+        if text is None:
+            start = time.perf_counter()
+            try:
+                text = await executors.inference_pool.run(run)
+            except HTTPException:
+                raise
+            except IllegalModelSelectionException as e:
+                raise HTTPException(400, str(e))
+            except Exception as e:
+                raise HTTPException(500, f"{backend} transcription failed: {str(e)}")
+            timings["inference"] = time.perf_counter() - start
+
+            await _cache_put(key, text)
+
     if not text:
-        try:
-            os.remove(tmp_path)
-        except:
-            pass
         raise HTTPException(
             status_code=500,
             detail="Speech-to-text failed. No transcription returned."
         )
 
+    return text, lang, timings
+
+
+#   BATCH TRANSCRIPTION
+async def open_batch(
+    files: List[UploadFile],
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """
+    Stage every upload (zip archives are expanded) before returning, so the
+    files outlive the request body, then hand back an async iterator that
+    yields one result dict per file as soon as it is ready. With lang=auto
+    the language is detected once for the whole batch.
+    """
+    backend, size = parse_model(model)
+    lang = (lang or "en").lower()
+    if backend != "whisper":
+        raise HTTPException(
+            status_code=400,
+            detail="Batch transcription only supports the 'whisper' model."
+        )
+    profile = resolve_profile(profile)
+
+    stack = AsyncExitStack()
     try:
-        os.remove(tmp_path)
-    except:
-        pass
+        staged = await stage_batch(
+            stack,
+            files,
+            max_bytes=settings.STT_MAX_UPLOAD_BYTES,
+            max_files=settings.STT_BATCH_MAX_FILES,
+            chunk_bytes=settings.STT_UPLOAD_CHUNK_BYTES,
+        )
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    if not staged:
+        await stack.aclose()
+        raise HTTPException(400, "No audio files in the batch")
+
+    return _run_batch(stack, staged, lang, size, profile, session_id)
+
+
+async def transcribe_batch(
+    files: List[UploadFile],
+    lang="en",
+    model=None,
+    session_id: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> List[dict]:
+    results = [item async for item in await open_batch(files, lang, model, session_id, profile)]
+    return sorted(results, key=lambda item: item["index"])
+
+
+def _batch_item(index: int, filename: str, text=None, error=None, duration_sec=None, language=None) -> dict:
+    return {
+        "index": index,
+        "filename": filename,
+        "text": text,
+        "error": error,
+        "duration_sec": duration_sec,
+        "language": language,
+    }
+
+
+def _describe_error(error: BaseException) -> str:
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    if isinstance(error, AudioProcessingError):
+        return f"Could not decode audio: {str(error)}"
+    return str(error) or type(error).__name__
+
+
+async def _run_batch(
+    stack: AsyncExitStack,
+    staged: List[Tuple[str, str]],
+    lang,
+    size: str,
+    profile: DecodeProfile,
+    session_id: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    async with stack:
+        pool = executors.preprocess_pool
+        limit = asyncio.Semaphore(pool.workers)
+
+        async def prepare(path):
+            async with limit:
+                return await pool.run(preprocessor.preprocess_file, path)
+
+        prepared = await asyncio.gather(
+            *(prepare(path) for _, path in staged), return_exceptions=True
+        )
+
+        engine = WhisperBackend(size)
+        stt = STT(
+            lang=lang,
+            model="whisper",
+            audio_file_name="",
+            preprocessor=preprocessor,
+            long_form=long_form,
+            decode_profile=profile,
+        )
+
+        # lang=auto: detect on the first decodable file, pin for the batch
+        first = next((r for r in prepared if not isinstance(r, BaseException)), None)
+        if lang == "auto" and first is not None:
+            try:
+                lang = await _resolve_language(engine, stt, first, lang, session_id, {})
+            except HTTPException as e:
+                prepared = [r if isinstance(r, BaseException) else e for r in prepared]
+
+        decodable = []
+        for index, ((name, _), result) in enumerate(zip(staged, prepared)):
+            if isinstance(result, BaseException):
+                yield _batch_item(index, name, error=_describe_error(result))
+                continue
+
+            key = _cache_key(result, lang, windowed=True, model_name=engine.cache_name(), profile=profile)
+            text = await _cache_get(key)
+            if text is not None:
+                yield _batch_item(
+                    index, name, text=text, duration_sec=result.metadata.duration_sec, language=lang
+                )
+            else:
+                decodable.append((index, name, result, key))
+
+        if not decodable:
+            return
+
+        # all clips share padded mel batches on the inference thread; each
+        # result is pushed back to the loop as soon as its clip is done
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def on_result(i: int, text: str):
+            loop.call_soon_threadsafe(queue.put_nowait, (i, text))
+
+        async def decode():
+            def run():
+                stt.transcribe_batch(
+                    engine.load(),
+                    [result for _, _, result, _ in decodable],
+                    lang=lang,
+                    on_result=on_result,
+                )
+
+            try:
+                await executors.inference_pool.run(run)
+            except Exception as e:
+                queue.put_nowait(e)
+            else:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(decode())
+        remaining = set(range(len(decodable)))
+
+        while True:
+            message = await queue.get()
+            if message is None:
+                break
+
+            if isinstance(message, BaseException):
+                for i in sorted(remaining):
+                    index, name, _, _ = decodable[i]
+                    yield _batch_item(index, name, error=_describe_error(message))
+                break
+
+            i, text = message
+            remaining.discard(i)
+            index, name, result, key = decodable[i]
+            await _cache_put(key, text)
+            yield _batch_item(index, name, text=text, duration_sec=result.metadata.duration_sec, language=lang)
 
-    return text
+        await task
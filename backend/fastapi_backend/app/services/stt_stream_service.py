@@ -0,0 +1,223 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from ai_ml.AudioPreprocessor import AudioChunk, AudioPreprocessor, AudioPreprocessorConfig, StreamingVAD
+from ai_ml.Speech2Text import STT, decode_profile
+from app.config import settings
+from app.core import models, executors
+from app.services.stt_service import session_languages
+
+# utterances are already VAD-segmented, so decoding skips a second VAD pass
+stream_preprocessor = AudioPreprocessor(
+    AudioPreprocessorConfig(vad_enabled=False, chunk_duration_sec=30.0)
+)
+
+PCM_ENCODING = "pcm_s16le"
+SAMPLE_RATE = stream_preprocessor.config.target_sample_rate
+
+
+class _FfmpegPipeDecoder:
+    """
+    Long-lived ffmpeg turning a compressed stream (e.g. WebM/Opus chunks
+    from MediaRecorder) written to stdin into s16le PCM on stdout.
+    """
+
+    async def start(self):
+        try:
+            self.proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-i", "pipe:0",
+                "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+                "pipe:1",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            raise HTTPException(500, "ffmpeg not found") from e
+
+    async def write(self, data: bytes):
+        self.proc.stdin.write(data)
+        await self.proc.stdin.drain()
+
+    async def read(self) -> bytes:
+        return await self.proc.stdout.read(1 << 16)
+
+    async def close(self):
+        if self.proc.stdin and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    def kill(self):
+        if self.proc.returncode is None:
+            self.proc.kill()
+
+
+class LiveTranscriptionSession:
+    """
+    One /stt/stream connection.
+
+    Client -> server: binary frames of audio (16 kHz mono s16le PCM, or a
+    compressed stream when encoding != pcm_s16le), then the text message
+    "end". Only "end" flushes the last utterance and sends "done"; a
+    disconnect drops the session without decoding anything further.
+
+    Server -> client (JSON):
+      {"type": "partial", "segment": n, "text": ...}   while the student speaks
+      {"type": "final", "segment": n, "text": ..., "start_sec": ..., "end_sec": ...}
+      {"type": "done", "text": <all finals joined>}
+      {"type": "error", "detail": ...}
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        lang: str = "en",
+        encoding: str = PCM_ENCODING,
+        session_id: Optional[str] = None,
+    ):
+        self.websocket = websocket
+        # "auto" is replaced by the detected language at the first decode
+        self.lang = (lang or "en").lower()
+        self.session_id = session_id
+        if self.lang == "auto" and session_id:
+            self.lang = session_languages.get(session_id) or "auto"
+        self.encoding = encoding.lower()
+
+        self.vad = StreamingVAD(
+            stream_preprocessor.config,
+            endpoint_ms=settings.STT_STREAM_ENDPOINT_MS,
+            max_utterance_sec=settings.STT_STREAM_MAX_UTTERANCE_SEC,
+        )
+        self.stt = STT(
+            lang=lang,
+            model="whisper",
+            audio_file_name="",
+            preprocessor=stream_preprocessor,
+            decode_profile=decode_profile(settings.STT_STREAM_DECODE_PROFILE),
+        )
+
+        self.partial_every = int(SAMPLE_RATE * settings.STT_STREAM_PARTIAL_INTERVAL_MS / 1000)
+        self.segment = 0
+        self.finals: list[str] = []
+        self._partial_task: Optional[asyncio.Task] = None
+        self._partial_samples = 0
+        self._send_lock = asyncio.Lock()
+        # a partial and a final can both reach the first decode of an "auto"
+        # session; detection must run once and the other must wait for it
+        self._detect_lock = asyncio.Lock()
+
+    async def run(self):
+        decoder = None
+        reader = None
+        try:
+            if self.encoding != PCM_ENCODING:
+                decoder = _FfmpegPipeDecoder()
+                await decoder.start()
+                reader = asyncio.create_task(self._pump(decoder))
+
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+                data = message.get("bytes")
+                if data:
+                    if decoder is not None:
+                        await decoder.write(data)
+                    else:
+                        await self._on_pcm(data)
+                elif (message.get("text") or "").strip().lower() in ("end", "stop", "eos"):
+                    break
+
+            if decoder is not None:
+                await decoder.close()
+                await reader
+
+            last = self.vad.flush()
+            if last is not None:
+                await self._finalize(last)
+
+            await self._send({"type": "done", "text": " ".join(t for t in self.finals if t)})
+            await self.websocket.close()
+
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if self._partial_task is not None:
+                self._partial_task.cancel()
+            if reader is not None:
+                reader.cancel()
+            if decoder is not None:
+                decoder.kill()
+
+    async def _pump(self, decoder: _FfmpegPipeDecoder):
+        while True:
+            pcm = await decoder.read()
+            if not pcm:
+                break
+            await self._on_pcm(pcm)
+
+    async def _on_pcm(self, pcm: bytes):
+        for utterance in self.vad.feed(pcm):
+            await self._finalize(utterance)
+
+        current = self.vad.current()
+        if (
+            current is not None
+            and len(current.audio) - self._partial_samples >= self.partial_every
+            and (self._partial_task is None or self._partial_task.done())
+        ):
+            self._partial_samples = len(current.audio)
+            self._partial_task = asyncio.create_task(self._partial(self.segment, current))
+
+    async def _partial(self, segment: int, utterance: AudioChunk):
+        try:
+            text = await self._decode(utterance)
+        except HTTPException:
+            # inference queue is saturated; skip this partial, the final still comes
+            return
+        if segment == self.segment and text:
+            await self._send({"type": "partial", "segment": segment, "text": text})
+
+    async def _finalize(self, utterance: AudioChunk):
+        segment = self.segment
+        self.segment += 1
+        self._partial_samples = 0
+
+        try:
+            text = await self._decode(utterance)
+        except HTTPException as e:
+            await self._send({"type": "error", "segment": segment, "detail": str(e.detail)})
+            return
+
+        self.finals.append(text)
+        await self._send({
+            "type": "final",
+            "segment": segment,
+            "text": text,
+            "start_sec": round(utterance.start_sec, 3),
+            "end_sec": round(utterance.end_sec, 3),
+        })
+
+    async def _decode(self, utterance: AudioChunk) -> str:
+        result = stream_preprocessor.preprocess_array(utterance.audio, "<stream>")
+
+        if self.lang == "auto":
+            async with self._detect_lock:
+                if self.lang == "auto":
+                    self.lang = await executors.inference_pool.run(
+                        self.stt.detect_language, models.whisper_model, result
+                    )
+                    if self.session_id:
+                        session_languages.put(self.session_id, self.lang)
+
+        text = await executors.inference_pool.run(
+            self.stt.transcribe_preprocessed, models.whisper_model, result, lang=self.lang
+        )
+        return text.strip()
+
+    async def _send(self, payload: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(payload))
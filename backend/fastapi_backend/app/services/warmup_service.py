@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import numpy as np
+
+from ai_ml.Speech2Text import STT, CTranslate2Backend, HFWhisperBackend, LongFormConfig, decode_profile
+from app.config import settings
+from app.core import executors, models
+from app.services.stt_service import preprocessor
+
+SAMPLE_RATE = 16000
+
+# read by GET /ready; "warming" until run_warmup() has finished
+status = {"state": "warming", "duration_sec": None, "stages": {}, "error": None}
+
+
+def synthetic_audio(seconds: float, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Voiced-sounding harmonic signal, enough to get through VAD and the decoder."""
+    t = np.arange(int(seconds * sr), dtype=np.float32) / sr
+    phase = 2 * np.pi * np.cumsum(120 + 30 * np.sin(2 * np.pi * 0.5 * t)) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    return (0.2 * voice * envelope).astype(np.float32)
+
+
+def _stt() -> STT:
+    return STT(
+        lang="en",
+        model="whisper",
+        audio_file_name="",
+        preprocessor=preprocessor,
+        decode_profile=decode_profile("fast"),
+    )
+
+
+def _warm_whisper(result):
+    stt = _stt()
+    # single-pass path, then the batched window path (mel thread pool + whisper.decode)
+    stt.transcribe_preprocessed(models.whisper_model, result)
+    STT.decode_windows(
+        models.whisper_model, [result.audio], "en", LongFormConfig(batch_size=1, mel_workers=1)
+    )
+
+
+def _warm_hf(result):
+    HFWhisperBackend().transcribe(_stt(), models.hf_stt_model, result, "en")
+
+
+def _warm_ct2(result):
+    CTranslate2Backend().transcribe(_stt(), models.ct2_stt_model, result, "en")
+
+
+async def run_warmup():
+    """
+    Push synthetic audio through every stage a first request would touch:
+    each preprocess worker process (imports, VAD) and every preloaded STT
+    model on the inference thread (mel filterbank, kernel selection, lazy
+    allocations). Runs as a background task; failures are reported but do
+    not keep the service from becoming ready.
+    """
+    start = time.perf_counter()
+    try:
+        audio = synthetic_audio(settings.STT_WARMUP_SEC)
+
+        stage_start = time.perf_counter()
+        pool = executors.preprocess_pool
+        results = await asyncio.gather(
+            *(pool.run(preprocessor.preprocess_array, audio, "<warmup>") for _ in range(pool.workers))
+        )
+        status["stages"]["preprocess"] = time.perf_counter() - stage_start
+
+        targets = [
+            ("whisper", models.whisper_model, _warm_whisper),
+            ("hf", models.hf_stt_model, _warm_hf),
+            ("ct2", models.ct2_stt_model, _warm_ct2),
+        ]
+        for name, model, warm in targets:
+            if model is None:
+                continue
+            stage_start = time.perf_counter()
+            for _ in range(max(1, settings.STT_WARMUP_RUNS)):
+                await executors.inference_pool.run(warm, results[0])
+            status["stages"][name] = time.perf_counter() - stage_start
+
+    except Exception as e:
+        print("Warmup failed:", e)
+        status["error"] = str(e)
+
+    status["duration_sec"] = time.perf_counter() - start
+    status["state"] = "ready"
+
+    stages = " ".join(f"stt_warmup_{k}_seconds={v:.3f}" for k, v in status["stages"].items())
+    print(f"metric stt_warmup_seconds={status['duration_sec']:.3f} {stages}".rstrip())
@@ -0,0 +1,92 @@
+"""Shared helpers for the scripts in benchmarks/.
+
+Run every benchmark from backend/fastapi_backend, e.g.
+    python -m benchmarks.bench_long_form --audio answer.wav
+"""
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(seconds: float, sr: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Speech-like test signal: harmonic bursts with a syllable-rate envelope,
+    separated by short pauses, over a low noise floor. Good enough to
+    exercise VAD, chunking and decoder timing; not meant for accuracy.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n, dtype=np.float32) / sr
+
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    pauses = (t % 5.0) < 4.0
+    audio = 0.2 * voice * syllables * pauses + 0.003 * rng.standard_normal(n)
+    return audio.astype(np.float32)
+
+
+def load_or_synthesize(path: Optional[str], seconds: float, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Load a mono clip and tile it to `seconds`, or synthesize one."""
+    if not path:
+        return synthetic_speech(seconds, sr)
+
+    audio, file_sr = sf.read(path, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if file_sr != sr:
+        from scipy.signal import resample_poly
+        g = np.gcd(file_sr, sr)
+        audio = resample_poly(audio, sr // g, file_sr // g).astype(np.float32)
+
+    reps = int(np.ceil(seconds * sr / max(len(audio), 1)))
+    return np.tile(audio, reps)[: int(seconds * sr)]
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance / reference length (case and punctuation folded)."""
+    ref = [w for w in (w.strip(".,!?;:\"'").lower() for w in reference.split()) if w]
+    hyp = [w for w in (w.strip(".,!?;:\"'").lower() for w in hypothesis.split()) if w]
+    if not ref:
+        return float(bool(hyp))
+
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KiB)."""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn: Callable, *args, repeat: int = 1, **kwargs) -> Tuple[float, object]:
+    """Best wall-clock time of `repeat` runs and the last return value."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence]) -> None:
+    cells = [[str(h) for h in headers]] + [
+        [f"{c:.3f}" if isinstance(c, float) else str(c) for c in row] for row in rows
+    ]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(headers))]
+    for i, row in enumerate(cells):
+        print(" | ".join(c.ljust(w) for c, w in zip(row, widths)))
+        if i == 0:
+            print("-+-".join("-" * w for w in widths))
@@ -0,0 +1,58 @@
+"""Real-time factor of each decode profile (fast / balanced / accurate).
+
+    python -m benchmarks.bench_decode_profiles --audio answer.wav --seconds 120
+
+Runs the single-pass path (whisper.transcribe with the profile's beam size,
+best-of, temperature fallback and conditioning) and the batched long-form
+path for every profile. Run on the CPU nodes the service is deployed on;
+a synthetic clip (no --audio) tends to trigger temperature fallback a lot,
+which exaggerates the gap between profiles.
+"""
+import argparse
+
+import whisper
+
+from ai_ml.AudioPreprocessor import AudioPreprocessor, AudioPreprocessorConfig
+from ai_ml.Speech2Text import DECODE_PROFILES, STT, LongFormConfig
+from benchmarks._common import load_or_synthesize, print_table, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", default=None)
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--profiles", nargs="+", default=list(DECODE_PROFILES), choices=list(DECODE_PROFILES))
+    args = parser.parse_args()
+
+    audio = load_or_synthesize(args.audio, args.seconds)
+    model = whisper.load_model(args.model, device="cpu")
+
+    preprocessor = AudioPreprocessor(
+        AudioPreprocessorConfig(vad_enabled=False, chunk_duration_sec=30.0, chunk_overlap_sec=1.0)
+    )
+    result = preprocessor.preprocess_array(audio, args.audio or "<synthetic>")
+
+    rows = []
+    for mode, long_form in (("single pass", None), ("long-form", LongFormConfig(min_duration_sec=0.0))):
+        baseline = None
+        for name in args.profiles:
+            stt = STT(
+                lang=args.lang,
+                model="whisper",
+                audio_file_name="",
+                preprocessor=preprocessor,
+                long_form=long_form,
+                decode_profile=DECODE_PROFILES[name],
+            )
+            elapsed, _ = timed(stt.transcribe_preprocessed, model, result)
+            baseline = baseline or elapsed
+            rows.append([mode, name, elapsed, elapsed / args.seconds, baseline / elapsed])
+
+    print(f"{args.seconds:g} s clip, whisper-{args.model} on CPU")
+    print_table(["path", "profile", "wall s", "RTF", f"speedup vs {args.profiles[0]}"], rows)
+
+
+if __name__ == "__main__":
+    main()
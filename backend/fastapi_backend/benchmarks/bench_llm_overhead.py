@@ -0,0 +1,94 @@
+"""Per-request overhead of the LLM engines, excluding generation itself.
+
+    python -m benchmarks.bench_llm_overhead --requests 2000
+
+Every engine is driven by a FakeListLLM that returns a canned answer at
+once, so the timings are pure Python work: PromptTemplate / parser /
+format-instructions construction, prompt formatting and output parsing.
+"per request" builds a fresh engine for every call (what the services did
+before engines were shared); "shared" reuses one engine and its chain.
+"""
+import argparse
+import json
+import time
+
+from langchain_core.language_models.fake import FakeListLLM
+
+from ai_ml.Evaluation import EvaluationEngine
+from ai_ml.MCQGenerator import MCQGenerator
+from ai_ml.QuestionsGenerator import QuestionsGenerator
+from ai_ml.Rubrics import RubricsEngine
+from benchmarks._common import print_table
+
+MCQ_TEXT = "\n\n".join(
+    f"Question {i}: What is {i} + {i}?\nA) {i}\nB) {2 * i}\nC) {3 * i}\nD) {4 * i}\nAnswer: B" for i in range(1, 6)
+)
+
+CASES = [
+    (
+        "evaluation",
+        EvaluationEngine,
+        lambda engine, request: engine.model_evaluator(request),
+        {"rubric": ["Names the capital"], "question_text": "Capital of France?", "student_answer": "Paris", "max_marks": 5},
+        json.dumps({"score": 5, "strengths": ["correct"], "weakness": [], "justification": "ok", "suggested_improvement": "none"}),
+    ),
+    (
+        "rubrics",
+        RubricsEngine,
+        lambda engine, request: engine.create_rubrics(request),
+        {"question_id": "q1", "question_text": "Explain recursion.", "max_marks": 10},
+        json.dumps({"question_id": "q1", "question_text": "Explain recursion.", "rubrics": ["Defines base case", "Gives example"]}),
+    ),
+    (
+        "questions",
+        QuestionsGenerator,
+        lambda engine, request: engine.create_questions(request),
+        {"topic_id": "t1", "topic": "Sorting", "subject": "Algorithms", "num_questions": 3},
+        json.dumps({"topic_id": "t1", "topic": "Sorting", "questions": ["Q1?", "Q2?", "Q3?"]}),
+    ),
+    (
+        "mcq",
+        MCQGenerator,
+        lambda engine, request: engine.generate(request),
+        {"topic_id": "t1", "topic": "Arithmetic", "subject": "Maths", "num_questions": 5},
+        MCQ_TEXT,
+    ),
+]
+
+
+def per_request_us(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for name, engine_cls, call, request, answer in CASES:
+        llm = FakeListLLM(responses=[answer])
+
+        def fresh():
+            return call(engine_cls(model_name="fake", global_model=llm), dict(request))
+
+        shared_engine = engine_cls(model_name="fake", global_model=llm)
+
+        def shared():
+            return call(shared_engine, dict(request))
+
+        # warm imports and pydantic schema caches before timing either path
+        fresh(), shared()
+        before = per_request_us(fresh, args.requests)
+        after = per_request_us(shared, args.requests)
+        rows.append([name, before, after, before - after, before / after])
+
+    print(f"{args.requests} requests per engine, canned LLM output")
+    print_table(["engine", "per request us", "shared us", "saved us", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
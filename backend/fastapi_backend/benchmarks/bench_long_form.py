@@ -0,0 +1,58 @@
+"""Long-form transcription: single whisper.transcribe pass vs batched windows.
+
+    python -m benchmarks.bench_long_form --audio answer.wav --minutes 20
+
+The clip is tiled to the requested length (a synthetic signal is used when
+--audio is omitted, which only makes sense for timing).
+"""
+import argparse
+
+import whisper
+
+from ai_ml.AudioPreprocessor import AudioPreprocessor, AudioPreprocessorConfig
+from ai_ml.Speech2Text import STT, LongFormConfig
+from benchmarks._common import load_or_synthesize, print_table, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", default=None)
+    parser.add_argument("--minutes", type=float, default=20.0)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--mel-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    seconds = args.minutes * 60
+    audio = load_or_synthesize(args.audio, seconds)
+    model = whisper.load_model(args.model)
+
+    preprocessor = AudioPreprocessor(
+        AudioPreprocessorConfig(vad_enabled=False, chunk_duration_sec=30.0, chunk_overlap_sec=1.0)
+    )
+    result = preprocessor.preprocess_array(audio, args.audio or "<synthetic>")
+
+    rows = []
+    single, _ = timed(model.transcribe, audio, language=args.lang, fp16=False)
+    rows.append(["single pass", "-", single, single / seconds, 1.0])
+
+    for batch_size in args.batch_size:
+        stt = STT(
+            lang=args.lang,
+            model="whisper",
+            audio_file_name="",
+            preprocessor=preprocessor,
+            long_form=LongFormConfig(
+                min_duration_sec=0.0, batch_size=batch_size, mel_workers=args.mel_workers
+            ),
+        )
+        elapsed, _ = timed(stt.transcribe_long_form, model, result)
+        rows.append(["long-form", batch_size, elapsed, elapsed / seconds, single / elapsed])
+
+    print(f"{args.minutes:g} min clip, whisper-{args.model}, {len(result.chunks)} chunks")
+    print_table(["mode", "batch", "wall s", "RTF", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare STT backends on the same preprocessed clips.
+
+    python -m benchmarks.bench_stt_backends --audio q1.wav q2.wav --model base
+
+Variants: whisper (PyTorch fp32), whisper-int8 (dynamic int8, CPU only),
+ct2 (faster-whisper, CTranslate2 int8; skipped when not installed) and
+optionally hf. Each variant runs in its own spawned process, so load time
+and peak RSS are per backend. WER is measured against the whisper fp32
+transcript; with synthetic clips only the timing columns mean anything.
+"""
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+from benchmarks._common import (
+    SAMPLE_RATE, load_or_synthesize, peak_rss_mb, print_table, synthetic_speech, timed, word_error_rate,
+)
+
+VARIANTS = ["whisper", "whisper-int8", "ct2", "hf"]
+
+
+def _run(variant: str, model_name: str, clips, lang: str):
+    # imported in the child so the parent never holds a model
+    from ai_ml.AudioPreprocessor import AudioPreprocessor, AudioPreprocessorConfig
+    from ai_ml.ModelCreator import SpeechModelGenerator
+    from ai_ml.Speech2Text import STT, LongFormConfig, stt_backend
+
+    backend_name, _, precision = variant.partition("-")
+    SpeechModelGenerator.whisper_model_name = model_name
+    SpeechModelGenerator.whisper_registry.quantize_int8 = precision == "int8"
+    SpeechModelGenerator.ct2_model_name = model_name
+
+    preprocessor = AudioPreprocessor(
+        AudioPreprocessorConfig(vad_enabled=False, chunk_duration_sec=30.0, chunk_overlap_sec=1.0)
+    )
+    stt = STT(lang=lang, model=backend_name, audio_file_name="", preprocessor=preprocessor,
+              long_form=LongFormConfig(min_duration_sec=60.0))
+    backend = stt_backend(backend_name)
+
+    load_sec, model = timed(backend.load)
+    texts, elapsed = [], 0.0
+    for clip in clips:
+        result = preprocessor.preprocess_array(clip)
+        seconds, text = timed(backend.transcribe, stt, model, result, lang)
+        elapsed += seconds
+        texts.append(text)
+    return load_sec, elapsed, peak_rss_mb(), texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of each clip")
+    parser.add_argument("--model", default="base", help="whisper / faster-whisper size")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--backends", nargs="+", default=VARIANTS[:3], choices=VARIANTS)
+    args = parser.parse_args()
+
+    if args.audio:
+        clips = [load_or_synthesize(path, args.seconds) for path in args.audio]
+    else:
+        clips = [synthetic_speech(args.seconds, seed=seed) for seed in range(3)]
+    total_sec = sum(len(c) for c in clips) / SAMPLE_RATE
+
+    # the fp32 reference always runs first
+    variants = ["whisper"] + [v for v in args.backends if v != "whisper"]
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for variant in variants:
+        with ctx.Pool(1) as pool:
+            try:
+                results[variant] = pool.apply(_run, (variant, args.model, clips, args.lang))
+            except Exception as e:
+                print(f"{variant}: skipped ({e})")
+
+    _, reference_sec, _, reference = results["whisper"]
+    rows = []
+    for variant, (load_sec, elapsed, rss, texts) in results.items():
+        wer = float(np.mean([word_error_rate(r, h) for r, h in zip(reference, texts)]))
+        rows.append([variant, load_sec, elapsed, elapsed / total_sec, reference_sec / elapsed, rss, wer])
+
+    print(f"size {args.model}, {len(clips)} clips, {total_sec:.0f} s of audio")
+    print_table(["backend", "load s", "wall s", "RTF", "speedup", "peak RSS MB", "WER vs whisper"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Whisper on CPU: fp32 vs dynamic int8 linear layers.
+
+    python -m benchmarks.bench_whisper_int8 --audio q1.wav q2.wav --model base
+
+Each precision runs in its own spawned process so peak RSS is not shared.
+WER is measured against the fp32 transcript of the same clip. Without
+--audio a few short synthetic clips are used; their "transcripts" are
+noise, so only the timing and memory columns mean anything there.
+"""
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+from benchmarks._common import (
+    SAMPLE_RATE, load_or_synthesize, peak_rss_mb, print_table, synthetic_speech, timed, word_error_rate,
+)
+
+
+def _run(precision: str, model_name: str, clips, lang: str):
+    # imported in the child so the parent never holds a model
+    import whisper
+
+    from ai_ml.ModelCreator import quantize_whisper_int8
+
+    model = whisper.load_model(model_name, device="cpu")
+    if precision == "int8":
+        model = quantize_whisper_int8(model)
+
+    texts, elapsed = [], 0.0
+    for clip in clips:
+        seconds, output = timed(model.transcribe, clip, language=lang, fp16=False)
+        elapsed += seconds
+        texts.append(output["text"])
+    return elapsed, peak_rss_mb(), texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of each clip")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args()
+
+    if args.audio:
+        clips = [load_or_synthesize(path, args.seconds) for path in args.audio]
+    else:
+        clips = [synthetic_speech(args.seconds, seed=seed) for seed in range(3)]
+    total_sec = sum(len(c) for c in clips) / SAMPLE_RATE
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for precision in ("fp32", "int8"):
+        with ctx.Pool(1) as pool:
+            results[precision] = pool.apply(_run, (precision, args.model, clips, args.lang))
+
+    fp32_elapsed, _, reference = results["fp32"]
+    rows = []
+    for precision, (elapsed, rss, texts) in results.items():
+        wer = float(np.mean([word_error_rate(r, h) for r, h in zip(reference, texts)]))
+        rows.append([precision, elapsed, elapsed / total_sec, fp32_elapsed / elapsed, rss, wer])
+
+    print(f"whisper-{args.model} on CPU, {len(clips)} clips, {total_sec:.0f} s of audio")
+    print_table(["precision", "wall s", "RTF", "speedup", "peak RSS MB", "WER vs fp32"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# run from anywhere: tests import the app the way uvicorn does, from backend/fastapi_backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from ai_ml.AudioPreprocessor import AudioPreprocessor, AudioPreprocessorConfig, _dilate
+
+
+def test_dilate_grows_runs_on_both_sides():
+    mask = np.zeros(10, dtype=bool)
+    mask[5] = True
+    assert _dilate(mask, 2).tolist() == [False] * 3 + [True] * 5 + [False] * 2
+
+
+def test_dilate_clips_at_edges():
+    mask = np.array([True, False, False, False, True])
+    assert _dilate(mask, 1).tolist() == [True, True, False, True, True]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5])
+def test_dilate_keeps_length_when_mask_shorter_than_kernel(size):
+    mask = np.zeros(size, dtype=bool)
+    mask[0] = True
+    out = _dilate(mask, 4)
+    assert out.shape == mask.shape
+    assert out.all()
+
+
+def test_dilate_noop_cases():
+    mask = np.array([False, True, False])
+    assert _dilate(mask, 0) is mask
+    empty = np.zeros(0, dtype=bool)
+    assert _dilate(empty, 3).size == 0
+
+
+def test_short_voiced_clip_is_trimmed_without_error():
+    sr = 16000
+    t = np.arange(int(0.18 * sr)) / sr
+    tone = (0.5 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    result = AudioPreprocessor(AudioPreprocessorConfig(vad_padding_ms=300)).preprocess_array(tone)
+    assert result.audio.size <= tone.size
+
+
+def test_chunk_spans_single_span_when_short():
+    audio = np.zeros(16000, dtype=np.float32)
+    assert AudioPreprocessor._chunk_spans(audio, 16000, 2.0) == [(0, 16000)]
+
+
+def test_chunk_spans_cover_audio_with_overlap():
+    sr = 1000
+    audio = np.ones(10 * sr, dtype=np.float32)
+    spans = AudioPreprocessor._chunk_spans(audio, sr, max_sec=3.0, overlap_sec=0.5)
+    assert spans[0][0] == 0 and spans[-1][1] == audio.size
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert end - start <= 3 * sr
+        assert end - next_start == 500
+
+
+def test_chunk_spans_snap_to_quietest_frame():
+    sr = 1000
+    audio = np.ones(10 * sr, dtype=np.float32)
+    audio[2500:2520] = 0.0  # a pause 0.5 s before the nominal 3 s cut
+    spans = AudioPreprocessor._chunk_spans(audio, sr, max_sec=3.0, search_sec=1.0)
+    first_end = spans[0][1]
+    assert 2500 <= first_end < 2520
+
+
+def test_chunk_spans_stay_bounded_when_overlap_and_search_fill_the_chunk():
+    sr = 1000
+    audio = np.ones(300 * sr, dtype=np.float32)  # flat energy: every frame ties
+    spans = AudioPreprocessor._chunk_spans(audio, sr, max_sec=30.0, overlap_sec=15.0, search_sec=15.0)
+    assert len(spans) <= 2 * 300 // 30 + 1
+    assert spans[-1][1] == audio.size
+    assert all(b[0] - a[0] >= 15 * sr for a, b in zip(spans, spans[1:]))
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from ai_ml.AIExceptions import OutputParsingException
+from ai_ml.JSONExtractor import extract_json, output_text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # prose, fences and a second object around the answer
+        ('Sure:\n```json\n{"a": 1}\n```\nand {"b": 2}', {"a": 1}),
+        # braces and escaped quotes inside strings
+        ('{"a": "x}{\\"y"}', {"a": 'x}{"y'}),
+        # trailing commas
+        ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+        # stray and mismatched closers
+        ('] } {"a": [1}', {"a": [1]}),
+    ],
+)
+def test_extracts_and_repairs_complete_objects(text, expected):
+    assert json.loads(extract_json(text)) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": 1, "b": [1, 2,', {"a": 1, "b": [1, 2]}),
+        ('{"a": "cut', {"a": "cut"}),
+        ('{"a": "cut\\', {"a": "cut"}),
+        ('{"a": 1, "ke', {"a": 1}),
+        ('{"a": 1, "b"', {"a": 1}),
+        ('{"a"', {}),
+        ('{"a": 1, "b": ', {"a": 1}),
+        ('{"a": tr', {}),
+        ('{"a": 1.', {}),
+        ('{"a": -', {}),
+        ('{"a": 1, "b": [true, fa', {"a": 1, "b": [True]}),
+        ('{"a": 12', {"a": 12}),
+        ('{"a": null', {"a": None}),
+        ('{"a": {"b": "x", "c"', {"a": {"b": "x"}}),
+        ('{"a": ["x", "y"', {"a": ["x", "y"]}),
+        ('{', {}),
+    ],
+)
+def test_truncated_output_is_closed_into_valid_json(text, expected):
+    assert json.loads(extract_json(text)) == expected
+
+
+def test_no_object_raises():
+    with pytest.raises(OutputParsingException):
+        extract_json("no json here")
+
+
+def test_output_text_shapes():
+    assert output_text("x") == "x"
+    assert output_text({"generated_text": "x"}) == "x"
+    assert output_text([{"generated_text": "x"}]) == "x"
+    assert json.loads(output_text({"other": 1})) == {"other": 1}
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("transformers")
+pytest.importorskip("langchain_huggingface")
+
+from ai_ml.LLMBatcher import JSONObjectComplete, NthMarkerLine
+
+
+def feed(rule, pieces):
+    """Index of the piece that ended generation, or None."""
+    for i, piece in enumerate(pieces):
+        if rule.feed(piece):
+            return i
+    return None
+
+
+def test_json_rule_stops_when_first_object_closes():
+    pieces = ["Here", " [1]", ' {"a', '": "}{', '\\"', '", "b": [', "1, {", "}]", "}", " more"]
+    assert feed(JSONObjectComplete(), pieces) == 8
+
+
+def test_json_rule_ignores_brackets_before_the_object():
+    assert feed(JSONObjectComplete(), ["[", "]", "}", "x"]) is None
+
+
+def test_marker_rule_stops_after_nth_answer_line():
+    pieces = ["Question 1: q\nAns", "wer:", " B", "\n\n", "Question 2: q\n", "Answer", ": ", "C", "\n", "Question 3"]
+    assert feed(NthMarkerLine("Answer:", 2), pieces) == 8
+
+
+def test_marker_rule_waits_for_the_answer_itself():
+    pieces = ["Answer:", "\n", "B", "\n"]
+    assert feed(NthMarkerLine("Answer:", 1), pieces) == 3
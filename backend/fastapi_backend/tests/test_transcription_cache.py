@@ -0,0 +1,26 @@
+from ai_ml.TranscriptionCache import TranscriptionCache
+
+
+def test_disk_layer_tracks_bytes_and_evicts_least_recently_used(tmp_path):
+    cache = TranscriptionCache(max_entries=1, db_path=str(tmp_path / "t.sqlite3"), db_max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"  # disk hit, a is now more recent than b
+    cache.put("c", "cccc")
+
+    assert cache.stats()["disk_bytes"] == 8
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+
+
+def test_replacing_a_key_does_not_double_count(tmp_path):
+    cache = TranscriptionCache(db_path=str(tmp_path / "t.sqlite3"))
+    cache.put("a", "aaaa")
+    cache.put("a", "aa")
+    assert cache.stats()["disk_bytes"] == 2
+
+
+def test_running_total_survives_reopen(tmp_path):
+    path = str(tmp_path / "t.sqlite3")
+    TranscriptionCache(db_path=path).put("a", "aaaa")
+    assert TranscriptionCache(db_path=path).stats()["disk_bytes"] == 4